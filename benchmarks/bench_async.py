@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Event loop latency while scoring a mix of short and 200-char passwords,
+calling zxcvbn from a coroutine against awaiting zxcvbn_async. Python 3.5+.
+
+A ticker task asks to wake up every millisecond; its lateness is how long
+other tasks, such as request handlers, would have been kept waiting. With
+several scorers running, each gets a time slice before the ticker's turn.
+
+usage: python benchmarks/bench_async.py [count]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import asyncio
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import zxcvbn  # noqa: E402
+from pyzxcvbn.aio import zxcvbn_async  # noqa: E402
+from bench_batch import corpus  # noqa: E402
+
+TICK = 0.001
+
+
+def mixed_corpus(count, seed=0):
+    rng = random.Random(seed)
+    passwords = corpus(count, seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789!@#$ "
+    for k in range(0, count, 10):
+        passwords[k] = "".join(rng.choice(alphabet) for _ in range(200))
+    return passwords
+
+
+async def ticker(lags, done):
+    loop = asyncio.get_event_loop()
+    while not done.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def run(score, passwords, concurrency):
+    lags = []
+    done = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(lags, done))
+    queue = list(reversed(passwords))
+
+    async def worker():
+        while queue:
+            await score(queue.pop())
+            await asyncio.sleep(0)  # a request handler awaits I/O between requests
+
+    start = timeit.default_timer()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = timeit.default_timer() - start
+    done.set()
+    await tick
+    return elapsed, sorted(lags)
+
+
+async def blocking(password):
+    zxcvbn(password)
+
+
+def report(name, count, elapsed, lags):
+    def percentile(p):
+        return lags[min(int(p * len(lags)), len(lags) - 1)] * 1000 if lags else 0.0
+    print("{:14s} {:8.1f} passwords/s  loop lag p50 {:6.2f}ms  p99 {:6.2f}ms  max {:6.2f}ms".format(
+        name, count / elapsed, percentile(0.5), percentile(0.99), lags[-1] * 1000 if lags else 0.0))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 300
+    passwords = mixed_corpus(count)
+    zxcvbn(passwords[0])  # load the dictionaries
+
+    loop = asyncio.new_event_loop()
+    try:
+        for concurrency in [1, 8]:
+            print("{} concurrent scorers".format(concurrency))
+            for name, score in [("zxcvbn", blocking), ("zxcvbn_async", zxcvbn_async)]:
+                elapsed, lags = loop.run_until_complete(run(score, passwords, concurrency))
+                report(name, count, elapsed, lags)
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Throughput of zxcvbn_many against calling zxcvbn in a loop.
+
+usage: python benchmarks/bench_batch.py [count]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import zxcvbn, zxcvbn_many, BatchStats  # noqa: E402
+
+WORDS = ["correct", "horse", "battery", "staple", "dragon", "monkey", "love", "1990", "qwerty", "!", "2015"]
+USER_INPUTS = ["alice", "smith", "alice.smith@example.com", 1985]
+
+
+def corpus(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) for _ in range(count)]
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 2000
+    passwords = corpus(count)
+    zxcvbn(passwords[0])  # load the dictionaries
+
+    start = timeit.default_timer()
+    for password in passwords:
+        zxcvbn(password, USER_INPUTS)
+    loop = timeit.default_timer() - start
+
+    stats = BatchStats()
+    start = timeit.default_timer()
+    for _ in zxcvbn_many(passwords, USER_INPUTS, stats=stats):
+        pass
+    batch = timeit.default_timer() - start
+
+    print("zxcvbn loop   {:8.1f} passwords/s".format(count / loop))
+    print("zxcvbn_many   {:8.1f} passwords/s  {}".format(count / batch, stats))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
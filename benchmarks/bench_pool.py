@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Scaling of ZxcvbnPool with the number of worker processes.
+
+usage: python benchmarks/bench_pool.py [count] [chunksize]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import multiprocessing
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import zxcvbn_many  # noqa: E402
+from pyzxcvbn.pool import ZxcvbnPool  # noqa: E402
+
+from bench_batch import corpus  # noqa: E402
+
+WORKERS = [1, 2, 4, 8]
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 4000
+    chunksize = int(argv[2]) if len(argv) > 2 else 64
+    passwords = corpus(count)
+
+    start = timeit.default_timer()
+    for _ in zxcvbn_many(passwords):
+        pass
+    single = count / (timeit.default_timer() - start)
+    print("{} CPUs, {} passwords, chunksize {}".format(multiprocessing.cpu_count(), count, chunksize))
+    print("in-process      {:8.1f} passwords/s".format(single))
+
+    for workers in WORKERS:
+        with ZxcvbnPool(workers=workers, chunksize=chunksize) as pool:
+            start = timeit.default_timer()
+            pool.map(passwords)
+            rate = count / (timeit.default_timer() - start)
+        print("{} worker(s)     {:8.1f} passwords/s  x{:.2f}".format(workers, rate, rate / single))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
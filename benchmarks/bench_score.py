@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Policy checks: zxcvbn_score, with and without min_score, against the full
+zxcvbn result, with and without feedback, on a mix of common, word-based and
+random passwords such as a sign-up form receives.
+
+usage: python benchmarks/bench_score.py [count] [min_score] [repeat]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import zxcvbn, zxcvbn_score  # noqa: E402
+from bench_batch import corpus  # noqa: E402
+
+COMMON = ["password", "123456", "qwerty", "iloveyou", "Password1", "dragon", "monkey1", "letmein!", "abc123"]
+
+
+def policy_corpus(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789!@#$ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    passwords = corpus(count, seed)
+    for k in range(0, count, 3):
+        passwords[k] = "".join(rng.choice(alphabet) for _ in range(rng.randint(8, 16)))
+    for k in range(1, count, 5):
+        passwords[k] = rng.choice(COMMON)
+    return passwords
+
+
+def run(score, passwords, repeat):
+    """Return the best of repeat timings of scoring all the passwords"""
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        for password in passwords:
+            score(password)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 2000
+    min_score = int(argv[2]) if len(argv) > 2 else 3
+    repeat = int(argv[3]) if len(argv) > 3 else 3
+    passwords = policy_corpus(count)
+    zxcvbn(passwords[0])  # load the dictionaries
+
+    full = run(lambda password: zxcvbn(password)["score"] >= min_score, passwords, repeat)
+    no_feedback = run(lambda password: zxcvbn(password, feedback=False)["score"] >= min_score, passwords, repeat)
+    score = run(lambda password: zxcvbn_score(password) >= min_score, passwords, repeat)
+    policy = run(lambda password: zxcvbn_score(password, min_score=min_score) >= min_score, passwords, repeat)
+
+    print("zxcvbn                    {:8.1f} passwords/s".format(count / full))
+    print("zxcvbn(feedback=False)    {:8.1f} passwords/s".format(count / no_feedback))
+    print("zxcvbn_score              {:8.1f} passwords/s".format(count / score))
+    print("zxcvbn_score(min_score={}) {:8.1f} passwords/s".format(min_score, count / policy))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""spatial_match latency on keyboard-walk-heavy inputs.
+
+usage: python benchmarks/bench_spatial.py [number]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import matching  # noqa: E402
+
+PASSWORDS = [
+    "qwertyuiop[]\\asdfghjkl;'",
+    "1qaz2wsx3edc4rfv5tgb6yhn",
+    "zxcvbnm,./;lkjhgfdsa",
+    "!QAZ@WSX#EDC$RFV%TGB",
+    "aoeuidhtns-',.pyfgcrl",
+    "7894561230*-+/.",
+    "qwertyuiop[]\\asdfghjkl;'" * 4,
+]
+
+
+def main(argv):
+    number = int(argv[1]) if len(argv) > 1 else 500
+    matching.spatial_match("warm up")
+    for password in PASSWORDS:
+        seconds = timeit.timeit(lambda: matching.spatial_match(password), number=number) / number
+        print("{:>8.1f} us  {:3d} chars  {}".format(seconds * 1e6, len(password), password[:40]))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Cold-start benchmark: time and peak memory of importing pyzxcvbn, alone
+and up to the end of the first zxcvbn() call, for this tree and for the
+pyzxcvbn package of a baseline git revision (default: the first commit,
+which imports frequency_lists.py eagerly). Lazy loading makes the import
+cheap but moves the cost of building the ranked dicts to the first call, so
+the rows with that call compare the two end to end.
+
+Every sample runs in a fresh interpreter.
+
+usage: python benchmarks/bench_startup.py [repeat] [baseline_revision]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SCENARIOS = [
+    ("import pyzxcvbn", """
+import pyzxcvbn
+"""),
+    ("import pyzxcvbn + first zxcvbn() call", """
+import pyzxcvbn
+pyzxcvbn.zxcvbn("correcthorse")
+"""),
+]
+
+TIMER = """
+import resource
+import time
+_start = time.time()
+{code}
+print(time.time() - _start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def export_package(revision, path):
+    """Extract the pyzxcvbn package of a git revision into path
+    :param str revision:
+    :param str path:
+    :return: None
+    """
+    archive = os.path.join(path, "baseline.tar")
+    subprocess.check_call(["git", "archive", "-o", archive, revision, "pyzxcvbn"], cwd=ROOT)
+    with tarfile.open(archive) as tar:
+        tar.extractall(path)
+
+
+def run(code, root):
+    """Return the seconds taken by code and the peak RSS in kilobytes"""
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE="")
+    output = subprocess.check_output([sys.executable, "-c", TIMER.format(code=code)], env=env, cwd=root)
+    seconds, max_rss = output.decode("ascii").strip().splitlines()[-1].split()
+    return float(seconds), int(max_rss)
+
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else 10
+    baseline = argv[2] if len(argv) > 2 else subprocess.check_output(
+        ["git", "rev-list", "--max-parents=0", "HEAD"], cwd=ROOT).decode("ascii").split()[0]
+    baseline_root = tempfile.mkdtemp()
+    try:
+        export_package(baseline, baseline_root)
+        for name, code in SCENARIOS:
+            for label, root in [("baseline " + baseline[:7], baseline_root), ("this tree", ROOT)]:
+                run(code, root)  # warm the .pyc and the page cache
+                samples = sorted(run(code, root) for _ in range(repeat))
+                print("{:40s} {:16s} min {:7.1f} ms   median {:7.1f} ms   max RSS {:5.1f} MB".format(
+                    name, label, samples[0][0] * 1000, samples[len(samples) // 2][0] * 1000,
+                    max(max_rss for _, max_rss in samples) / 1024.0))
+    finally:
+        shutil.rmtree(baseline_root)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
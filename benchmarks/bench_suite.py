@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite over synthetic password corpora, with regression gating.
+
+Every corpus is generated from a fixed seed, so runs are comparable, and is
+scored several times keeping the best time of each password. For each
+corpus it reports end-to-end throughput, latency percentiles, the
+throughput of each matcher and of the guess search (from the profile hook),
+and the peak of traced memory (Python 3.4+, measured in a separate pass).
+
+usage:
+    python benchmarks/bench_suite.py [--count N] [--output baseline.json]
+    python benchmarks/bench_suite.py --compare baseline.json [--tolerance 0.25]
+
+With --compare, the exit status is 1 when a throughput dropped, or a latency
+or the peak memory grew, by more than the tolerance (a fraction). Timings are
+scaled by the speed of a calibration workload timed along each corpus, which
+absorbs a busy or throttled machine, but not a different one: record the
+baseline on the machine that compares against it.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import json
+import os
+import platform
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import zxcvbn  # noqa: E402
+from pyzxcvbn import matching  # noqa: E402
+from pyzxcvbn.adjacency_graphs import adjacency_graphs  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+DEFAULT_COUNT = 300
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+# phases taking less time per password than this are timer noise, not gated
+MIN_GATED_PHASE_US = 20
+
+
+def ranked_words(name, count):
+    ranked_dict = matching.RANKED_DICTIONARIES[name]
+    return sorted(ranked_dict, key=ranked_dict.get)[:count]
+
+
+def common_passwords(rng, count):
+    words = ranked_words("passwords", 2000)
+    return [rng.choice(words) + rng.choice(["", "", "1", "123", "!"]) for _ in range(count)]
+
+
+def passphrases(rng, count):
+    words = ranked_words("english", 5000)
+    return [rng.choice([" ", "-", ""]).join(rng.choice(words) for _ in range(rng.randint(4, 6)))
+            for _ in range(count)]
+
+
+def l33t_passwords(rng, count):
+    words = ranked_words("passwords", 1000) + ranked_words("english", 1000)
+    passwords = []
+    for _ in range(count):
+        word = rng.choice(words)
+        chars = [rng.choice(matching.L33T_TABLE[c]) if c in matching.L33T_TABLE and rng.random() < 0.6 else c
+                 for c in word]
+        passwords.append("".join(chars).capitalize() + str(rng.randint(0, 99)))
+    return passwords
+
+
+def keyboard_walks(rng, count):
+    graph = adjacency_graphs["qwerty"]
+    keys = [key for key in graph if key.isalnum()]
+    passwords = []
+    for _ in range(count):
+        key = rng.choice(keys)
+        walk = [key]
+        for _ in range(rng.randint(5, 13)):
+            neighbors = [n for n in graph[walk[-1][-1]] if n]
+            key = rng.choice(neighbors)
+            walk.append(key[1] if rng.random() < 0.1 else key[0])
+        passwords.append("".join(walk))
+    return passwords
+
+
+def dates(rng, count):
+    names = ranked_words("female_names", 300) + ranked_words("male_names", 300)
+    passwords = []
+    for _ in range(count):
+        year = rng.randint(1950, 2020)
+        month, day = rng.randint(1, 12), rng.randint(1, 28)
+        date = rng.choice([
+            "{d}/{m}/{y}", "{y}{m:02d}{d:02d}", "{m:02d}{d:02d}{yy:02d}", "{d}.{m}.{yy:02d}", "{y}-{m:02d}-{d:02d}"
+        ]).format(d=day, m=month, y=year, yy=year % 100)
+        passwords.append(rng.choice(names) + date if rng.random() < 0.5 else date)
+    return passwords
+
+
+def repeats(rng, count):
+    words = ranked_words("passwords", 500)
+    passwords = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            base = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(1, 4)))
+        else:
+            base = rng.choice(words)
+        passwords.append(base * rng.randint(2, 6))
+    return passwords
+
+
+def random_strings(rng, count):
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(12, 32))) for _ in range(count)]
+
+
+CORPORA = [
+    ("common", common_passwords),
+    ("passphrase", passphrases),
+    ("l33t", l33t_passwords),
+    ("keyboard", keyboard_walks),
+    ("date", dates),
+    ("repeat", repeats),
+    ("random", random_strings),
+]
+
+# metric -> whether a higher value is better
+METRICS = {
+    "throughput": True,
+    "latency_p50_ms": False,
+    "latency_p90_ms": False,
+    "latency_p99_ms": False,
+    "peak_memory_kb": False,
+}
+
+
+def percentile(values, p):
+    return values[min(int(p * len(values)), len(values) - 1)]
+
+
+def calibrate(repeat):
+    """Return the best time of a fixed pure-Python workload, a measure of the
+    machine's speed at the moment"""
+    def workload():
+        table = {}
+        for k in range(20000):
+            key = str(k * 7919 % 10007)
+            table[key] = table.get(key[::-1], 0) + len(key)
+        return sorted(table.items())
+    return min(timeit.repeat(workload, number=1, repeat=max(repeat, 3)))
+
+
+def measure(passwords, repeat):
+    timer = timeit.default_timer
+    # best of repeat runs, per password and per phase, to keep noise out
+    latencies = [float("inf")] * len(passwords)
+    phases = {}
+    for _ in range(repeat):
+        run_phases = {}
+
+        def collect(profile):
+            for phase, nanoseconds in profile.timings.items():
+                run_phases[phase] = run_phases.get(phase, 0) + nanoseconds
+
+        for k, password in enumerate(passwords):
+            start = timer()
+            zxcvbn(password, profile=collect)
+            latencies[k] = min(latencies[k], timer() - start)
+        for phase, nanoseconds in run_phases.items():
+            phases[phase] = min(phases.get(phase, nanoseconds), nanoseconds)
+    latencies.sort()
+
+    result = {
+        "throughput": len(passwords) / sum(latencies),
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p90_ms": percentile(latencies, 0.9) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": latencies[-1] * 1000,
+    }
+    # passwords per second each phase alone could sustain
+    for phase, nanoseconds in phases.items():
+        result["phase_throughput." + phase] = len(passwords) * 1e9 / nanoseconds if nanoseconds else 0.0
+
+    result["calibration_s"] = calibrate(repeat)
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        for password in passwords:
+            zxcvbn(password)
+        result["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+    return result
+
+
+def run(count, seed=0, repeat=DEFAULT_REPEAT):
+    zxcvbn("correcthorse")  # load the dictionaries
+    corpora = {}
+    for name, generate in CORPORA:
+        corpora[name] = measure(generate(random.Random(seed), count), repeat)
+    return {
+        "python": platform.python_version(),
+        "count": count,
+        "seed": seed,
+        "repeat": repeat,
+        "corpora": corpora,
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Return the regressions of current against baseline, as printable lines
+    :rtype: list
+    """
+    regressions = []
+    for corpus, metrics in sorted(current["corpora"].items()):
+        previous = baseline["corpora"].get(corpus, {})
+        # how much slower the machine ran than when the baseline was recorded
+        slowdown = metrics["calibration_s"] / previous["calibration_s"] if previous.get("calibration_s") else 1.0
+        for metric, value in sorted(metrics.items()):
+            if not previous.get(metric):
+                continue
+            if metric.startswith("phase_throughput."):
+                higher_is_better = previous[metric] < 1e6 / MIN_GATED_PHASE_US or None
+            else:
+                higher_is_better = METRICS.get(metric)
+            if higher_is_better is None:
+                continue
+            if metric != "peak_memory_kb":
+                value = value * slowdown if higher_is_better else value / slowdown
+            change = value / previous[metric] - 1
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append("{}: {} {:.3f} -> {:.3f} ({:+.0%} speed-adjusted)".format(
+                    corpus, metric, previous[metric], value, change))
+    return regressions
+
+
+def report(results):
+    print("python {}, {} passwords per corpus".format(results["python"], results["count"]))
+    print("{:12s} {:>10s} {:>9s} {:>9s} {:>9s} {:>10s}  slowest phase".format(
+        "corpus", "pw/s", "p50 ms", "p99 ms", "max ms", "peak kB"))
+    for name, _ in CORPORA:
+        metrics = results["corpora"][name]
+        phases = [(v, k.split(".", 1)[1]) for k, v in metrics.items() if k.startswith("phase_throughput.")]
+        slowest = min(phases)[1] if phases else ""
+        print("{:12s} {:10.1f} {:9.3f} {:9.3f} {:9.3f} {:>10s}  {}".format(
+            name, metrics["throughput"], metrics["latency_p50_ms"], metrics["latency_p99_ms"],
+            metrics["latency_max_ms"],
+            "{:.0f}".format(metrics["peak_memory_kb"]) if "peak_memory_kb" in metrics else "-", slowest))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="passwords per corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="runs per corpus, keeping the best time of each password (default %(default)s)")
+    parser.add_argument("--output", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative change (default %(default)s)")
+    args = parser.parse_args(argv[1:])
+
+    results = run(args.count, args.seed, args.repeat)
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for setting in ["count", "seed"]:
+            if baseline.get(setting) != results[setting]:
+                print("warning: baseline has {} {}, this run {}".format(setting, baseline.get(setting), results[setting]))
+        regressions = compare(baseline, results, args.tolerance)
+        for line in regressions:
+            print("REGRESSION " + line)
+        if regressions:
+            return 1
+        print("no regression beyond {:.0%}".format(args.tolerance))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from .main import zxcvbn
+from .main import zxcvbn, zxcvbn_many, zxcvbn_score, BatchStats, ZxcvbnSession
 
 __title__ = "pyzxcvbn"
 __version__ = "0.8.0"
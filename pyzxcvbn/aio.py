@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""asyncio entry point, for Python 3.5+.
+
+zxcvbn_async runs the same steps as zxcvbn, but when it has been computing
+for longer than a time slice it lets the event loop run other tasks. It does
+so between match functions and between columns of the guess search, so a
+long password no longer blocks the loop for the whole of its scoring.
+"""
+from __future__ import absolute_import
+import asyncio
+import datetime
+import timeit
+
+from . import matching
+from . import scoring
+from .main import sanitize_user_inputs, _match_budget, _scored_prefix, _with_estimates
+
+# longest stretch of computation, in seconds, before the event loop gets a turn
+DEFAULT_TIME_SLICE = 0.002
+
+
+async def zxcvbn_async(password, user_inputs=(), time_slice=DEFAULT_TIME_SLICE, max_length=None):
+    """Measure strength of the password, same as zxcvbn(password, user_inputs, max_length=max_length).
+    calc_time excludes the time spent running other tasks.
+    :param str password:
+    :param list user_inputs:
+    :param float time_slice: seconds of computation between two yields to the event loop
+    :param int max_length: see zxcvbn
+    :rtype: dict
+    """
+    timer = timeit.default_timer
+    slice_start = timer()
+    busy = 0.0
+
+    ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+    prefix = _scored_prefix(password, max_length)
+    matches = []
+    for matcher in matching.match_functions(ranked_dictionaries):
+        matches += matcher(prefix)
+        if timer() - slice_start >= time_slice:
+            busy += timer() - slice_start
+            await asyncio.sleep(0)
+            slice_start = timer()
+    matches = sorted(matches, key=lambda x: (x.i, x.j))[:_match_budget(max_length)]
+
+    for result in scoring.most_guessable_match_sequence_steps(prefix, matches):
+        if timer() - slice_start >= time_slice:
+            busy += timer() - slice_start
+            await asyncio.sleep(0)
+            slice_start = timer()
+
+    result = _with_estimates(scoring.with_bruteforce_remainder(result, password))
+    result["calc_time"] = datetime.timedelta(seconds=busy + timer() - slice_start)
+    return result
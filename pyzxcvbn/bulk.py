@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Guesses and scores of many passwords, for offline audits.
+
+score_many skips the attack times and the feedback, and estimates the
+guesses of the matches of a whole chunk of passwords at once: one array
+operation per pattern over all the dictionary, regex, sequence, date and
+bruteforce matches of the chunk, instead of a function call per match.
+The array operations need NumPy (pip install pyzxcvbn[numpy]); without it
+the same estimates are computed match by match.
+"""
+from __future__ import absolute_import
+import bisect
+
+from . import matching
+from . import scoring
+from . import time_estimates
+from .main import sanitize_user_inputs, _match_budget, _scored_prefix
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_CHUNKSIZE = 1000
+
+CHAR_CLASS_BASES = {
+    "alpha_lower": 26,
+    "alpha_upper": 26,
+    "alpha": 52,
+    "alphanumeric": 62,
+    "digits": 10,
+    "symbols": 33
+}
+OBVIOUS_SEQUENCE_STARTS = frozenset(["a", "A", "z", "Z", "0", "1", "9"])
+
+
+# Each estimate returns the guesses of the matches and whether the scalar
+# function gives an int for them: ints keep the products of the guess search
+# exact past 2 ** 53, so they are converted back for the same results.
+
+def _dictionary_guesses(matches):
+    for m in matches:
+        # kept on the match for display, as dictionary_guesses does
+        m.base_guesses = m.rank
+        m.uppercase_variations = scoring.uppercase_variations(m)
+        m.l33t_variations = scoring.l33t_variations(m)
+    ranks = numpy.array([m.rank for m in matches], dtype=float)
+    uppercase_variations = numpy.array([m.uppercase_variations for m in matches], dtype=float)
+    l33t_variations = numpy.array([m.l33t_variations for m in matches], dtype=float)
+    reversed_variations = numpy.array([2 if m.reversed else 1 for m in matches], dtype=float)
+    guesses = ranks * uppercase_variations * l33t_variations * reversed_variations
+    # the int products are exact in floats below 2 ** 53, the others are redone in ints
+    inexact = numpy.flatnonzero(guesses >= 2.0 ** 53).tolist()
+    if inexact:
+        guesses = guesses.astype(object)
+        for k in inexact:
+            m = matches[k]
+            guesses[k] = m.rank * m.uppercase_variations * m.l33t_variations * (2 if m.reversed else 1)
+    return guesses, numpy.ones(len(matches), dtype=bool)
+
+
+def _regex_guesses(matches):
+    bases = numpy.array([CHAR_CLASS_BASES.get(m.regex_name, 0) for m in matches], dtype=float)
+    lengths = numpy.array([len(m.token) for m in matches], dtype=float)
+    # as regex_guesses: the year itself, not its distance, is made absolute
+    years = numpy.array([m.year if m.regex_name == "recent_year" else 0 for m in matches], dtype=float)
+    year_spaces = numpy.fabs(years) - scoring.REFERENCE_YEAR
+    small_years = year_spaces < scoring.MIN_YEAR_SPACE
+    year_spaces = numpy.where(small_years, scoring.MIN_YEAR_SPACE, year_spaces)
+    char_classes = bases > 0
+    return numpy.where(char_classes, numpy.power(bases, lengths), year_spaces), ~char_classes & small_years
+
+
+def _sequence_guesses(matches):
+    base_guesses = numpy.array([
+        4 if m.token[0] in OBVIOUS_SEQUENCE_STARTS else 10 if m.token[0].isdigit() else 26
+        for m in matches
+    ], dtype=float)
+    descending = numpy.array([not m.ascending for m in matches])
+    lengths = numpy.array([len(m.token) for m in matches], dtype=float)
+    return numpy.where(descending, base_guesses * 2, base_guesses) * lengths, numpy.ones(len(matches), dtype=bool)
+
+
+def _date_guesses(matches):
+    years = numpy.array([m.year for m in matches], dtype=float)
+    separators = numpy.array([bool(m.separator) for m in matches])
+    year_spaces = numpy.fabs(years - scoring.REFERENCE_YEAR)
+    small_years = year_spaces < scoring.MIN_YEAR_SPACE
+    guesses = numpy.where(small_years, scoring.MIN_YEAR_SPACE, year_spaces) * 31 * 12
+    return numpy.where(separators, guesses * 4, guesses), small_years
+
+
+# pattern -> estimate of the raw guesses of a list of its matches, as arrays
+VECTORIZED_ESTIMATES = {
+    "dictionary": _dictionary_guesses,
+    "regex": _regex_guesses,
+    "sequence": _sequence_guesses,
+    "date": _date_guesses
+}
+
+
+def estimate_guesses_many(matches, passwords):
+    """Set the guesses of every match, same as calling
+    scoring.estimate_guesses(matches[k], passwords[k]) for each k
+    :param list matches: match_types.Match objects
+    :param list passwords: the password each match was found in
+    :return: None
+    """
+    if numpy is None:
+        for match, password in zip(matches, passwords):
+            scoring.estimate_guesses(match, password)
+        return
+
+    columns = {}
+    for match, password in zip(matches, passwords):
+        if not match.guesses:
+            columns.setdefault(match.pattern, ([], []))
+            columns[match.pattern][0].append(match)
+            columns[match.pattern][1].append(len(password))
+    for pattern, (column, password_lengths) in columns.items():
+        if pattern not in VECTORIZED_ESTIMATES:
+            for match, password_length in zip(column, password_lengths):
+                scoring.estimate_guesses_for_length(match, password_length)
+            continue
+        token_lengths = numpy.array([len(m.token) for m in column])
+        min_guesses = numpy.where(
+            token_lengths < numpy.array(password_lengths),
+            numpy.where(token_lengths == 1, scoring.MIN_SUBMATCH_GUESSES_SINGLE_CHAR,
+                        scoring.MIN_SUBMATCH_GUESSES_MULTI_CHAR),
+            1)
+        guesses, integral = VECTORIZED_ESTIMATES[pattern](column)
+        integral = numpy.where(min_guesses > guesses, True, integral)
+        guesses = numpy.maximum(guesses, min_guesses)
+        for match, value, is_int in zip(column, guesses.tolist(), integral.tolist()):
+            match.guesses = int(value) if is_int else value
+            match.guesses_log10 = scoring.log10(match.guesses)
+
+
+def guesses_to_scores(guesses):
+    """time_estimates.guesses_to_score of every value
+    :param list guesses:
+    :rtype: list
+    """
+    thresholds = time_estimates.SCORE_THRESHOLDS
+    if numpy is None:
+        return [bisect.bisect_right(thresholds, value) for value in guesses]
+    return numpy.searchsorted(thresholds, numpy.array(guesses, dtype=float), side="right").tolist()
+
+
+def score_many(passwords, user_inputs=(), max_length=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Measure the guesses and score of many passwords, yielding for each a
+    dict with the "guesses", "guesses_log10" and "score" that zxcvbn would
+    give it, in order
+    :param iterable passwords:
+    :param list user_inputs:
+    :param int max_length: see zxcvbn
+    :param int chunksize: passwords whose matches are estimated together
+    :rtype: generator
+    """
+    ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+    chunk = []
+    for password in passwords:
+        chunk.append(password)
+        if len(chunk) == chunksize:
+            for result in _score_chunk(chunk, ranked_dictionaries, max_length):
+                yield result
+            chunk = []
+    if chunk:
+        for result in _score_chunk(chunk, ranked_dictionaries, max_length):
+            yield result
+
+
+def _score_chunk(passwords, ranked_dictionaries, max_length):
+    prefixes = [_scored_prefix(password, max_length) for password in passwords]
+    matches_by_password = [matching.omnimatch(prefix, ranked_dictionaries, _max_matches=_match_budget(max_length))
+                           for prefix in prefixes]
+    estimate_guesses_many(
+        [match for matches in matches_by_password for match in matches],
+        [prefix for prefix, matches in zip(prefixes, matches_by_password) for _ in matches])
+
+    results = []
+    for password, prefix, matches in zip(passwords, prefixes, matches_by_password):
+        result = scoring.most_guessable_match_sequence(prefix, matches)
+        result = scoring.with_bruteforce_remainder(result, password)
+        results.append({"guesses": result["guesses"], "guesses_log10": result["guesses_log10"]})
+    for result, score in zip(results, guesses_to_scores([result["guesses"] for result in results])):
+        result["score"] = score
+    return results
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Cache zxcvbn results for repeated passwords.
+
+Entries are keyed on an HMAC-SHA256 of the password and the sanitized user
+inputs under a secret salt, so the plaintext never becomes a key. Results are
+deep-copied into and out of the cache, so callers may mutate what they get.
+Note that a cached result still holds the password and its tokens: an
+external store must be as trusted as the process itself.
+"""
+from __future__ import absolute_import
+import abc
+import collections
+import copy
+import datetime
+import hashlib
+import hmac
+import os
+import threading
+import timeit
+
+import six
+
+from .main import sanitize_user_inputs, zxcvbn
+
+DEFAULT_MAXSIZE = 1024
+
+
+@six.add_metaclass(abc.ABCMeta)
+class CacheStore(object):
+    """Interface of a result store, such as a wrapper around memcached or redis.
+    Keys are hex strings and values zxcvbn result dicts, which the store must
+    not hand out for mutation. A store missing a method can't be created.
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Return the value stored under key, or None
+        :param str key:
+        :rtype: dict
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """Store value under key
+        :param str key:
+        :param dict value:
+        :return: None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove every value
+        :return: None
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(CacheStore):
+    """Thread-safe in-process store keeping the maxsize most recently used
+    entries, each for at most ttl seconds (forever when ttl is None)
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None, _timer=timeit.default_timer):
+        """
+        :param int maxsize:
+        :param float ttl:
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0  # entries dropped for room or age
+        self._timer = _timer
+        self._entries = collections.OrderedDict()  # key -> (expiry, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiry, value = entry
+            if expiry is not None and self._timer() >= expiry:
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            # move to the most recently used end
+            del self._entries[key]
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        expiry = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expiry, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResultCache(object):
+    """zxcvbn with a result cache.
+
+        cache = ResultCache(maxsize=10000, ttl=300)
+        result = cache.zxcvbn(password, user_inputs)
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None, store=None, salt=None):
+        """
+        :param int maxsize: entries kept by the default MemoryStore
+        :param float ttl: seconds an entry of the default MemoryStore is kept
+        :param CacheStore store: store to use instead of a MemoryStore
+        :param bytes salt: key salt, random by default. Processes sharing an
+            external store must share the salt.
+        """
+        self.store = MemoryStore(maxsize, ttl) if store is None else store
+        self.salt = os.urandom(16) if salt is None else salt
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def evictions(self):
+        """Entries the store dropped, when it counts them"""
+        return getattr(self.store, "evictions", 0)
+
+    def key(self, password, user_inputs=(), max_length=None):
+        """Return the cache key of a password, its user inputs and max_length
+        :param str password:
+        :param list user_inputs:
+        :param int max_length:
+        :rtype: str
+        """
+        digest = hmac.new(self.salt, digestmod=hashlib.sha256)
+        if max_length is not None:
+            # the values below start with a digit, this can't be taken for one
+            digest.update("max_length={};".format(max_length).encode("ascii"))
+        # length-prefixed, so that no two argument lists share an encoding
+        for value in [password] + sanitize_user_inputs(user_inputs):
+            if isinstance(value, six.text_type):
+                value = value.encode("utf-8")
+            digest.update(str(len(value)).encode("ascii") + b":" + value)
+        return digest.hexdigest()
+
+    def zxcvbn(self, password, user_inputs=(), max_length=None):
+        """Same as zxcvbn(password, user_inputs, max_length=max_length), served
+        from the cache when possible. calc_time is the time this call took.
+        :param str password:
+        :param list user_inputs:
+        :param int max_length: see zxcvbn
+        :rtype: dict
+        """
+        start = timeit.default_timer()
+        key = self.key(password, user_inputs, max_length)
+        cached = self.store.get(key)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if cached is None:
+            result = zxcvbn(password, user_inputs, max_length=max_length)
+            self.store.set(key, copy.deepcopy(result))
+        else:
+            result = copy.deepcopy(cached)
+            result["calc_time"] = datetime.timedelta(seconds=timeit.default_timer() - start)
+        return result
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        self.store.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+        if hasattr(self.store, "evictions"):
+            self.store.evictions = 0
+
+    def __repr__(self):
+        return "ResultCache(hits={}, misses={}, evictions={})".format(
+            self.hits, self.misses, self.evictions)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Exact binomial coefficients, memoized by row.
+
+The guess estimates sum C(n, 1) + ... + C(n, k) for the ways to capitalize,
+l33t-substitute or shift up to k of the n characters of a token. The rows of
+Pascal's triangle and their prefix sums are computed once per n, in exact
+integers, so every further sum is a lookup.
+"""
+from __future__ import absolute_import
+import threading
+
+from six.moves import range
+
+# rows are memoized for n up to this, larger ones are computed on demand
+MAX_CACHED_ROW = 200
+_rows = {}
+_prefix_sums = {}
+_lock = threading.Lock()
+
+
+def _row(n):
+    """Return [C(n, 0), ..., C(n, n)] and its prefix sums, memoized
+    :param int n:
+    :rtype: tuple
+    """
+    row = _rows.get(n)
+    if row is not None:
+        return row, _prefix_sums[n]
+    row = [1] * (n + 1)
+    for i in range(1, n // 2 + 1):
+        row[i] = row[n - i] = row[i - 1] * (n - i + 1) // i
+    prefix_sums = [0] * (n + 1)
+    total = 0
+    for i, value in enumerate(row):
+        total += value
+        prefix_sums[i] = total
+    if n <= MAX_CACHED_ROW:
+        with _lock:
+            # readers look up _rows first
+            _prefix_sums[n] = prefix_sums
+            _rows[n] = row
+    return row, prefix_sums
+
+
+def binom(n, k):
+    """Return the binomial coefficient (n choose k), 0 when k is outside [0, n]
+    :param int n:
+    :param int k:
+    :rtype: int
+    """
+    if k < 0 or k > n:
+        return 0
+    return _row(n)[0][k]
+
+
+def binom_sum(n, k):
+    """Return C(n, 1) + C(n, 2) + ... + C(n, k)
+    :param int n:
+    :param int k:
+    :rtype: int
+    """
+    if k < 1 or n < 1:
+        return 0
+    return _row(n)[1][min(k, n)] - 1
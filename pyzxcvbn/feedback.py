@@ -1,158 +1,234 @@
 # -*- coding: utf-8 -*-
+"""Feedback on weak passwords.
+
+Every warning and suggestion is a message ID of MESSAGES, which holds the
+English texts. get_feedback_ids picks the IDs of a password from the
+immutable templates below, without building any text, and get_feedback
+looks them up in MESSAGES or in a table of translations with the same IDs.
+"""
 from __future__ import absolute_import
-import re
 
 from . import scoring
 
+try:
+    from types import MappingProxyType
+except ImportError:  # python 2: MESSAGES is a plain dict, don't mutate it
+    MappingProxyType = dict
+
+# read-only, copy it to start a translation
+MESSAGES = MappingProxyType({
+    # default
+    "use_a_few_words": "Use a few words, avoid common phrases",
+    "no_need_for_mixed_chars": "No need for symbols, digits, or uppercase letters",
+    "add_another_word": "Add another word or two. Uncommon words are better.",
+    # spatial
+    "straight_rows_of_keys_are_easy": "Straight rows of keys are easy to guess",
+    "short_keyboard_patterns_are_easy": "Short keyboard patterns are easy to guess",
+    "use_longer_keyboard_patterns": "Use a longer keyboard pattern with more turns",
+    # repeat
+    "repeated_chars_are_easy": "Repeats like 'aaa' are easy to guess",
+    "repeated_patterns_are_easy": "Repeats like 'abcabcabc' are only slightly harder to guess than 'abc'",
+    "avoid_repeated_words_and_chars": "Avoid repeated words and characters",
+    # sequence
+    "sequences_are_easy": "Sequences like abc or 6543 are easy to guess",
+    "avoid_sequences": "Avoid sequences",
+    # regex
+    "recent_years_are_easy": "Recent years are easy to guess",
+    "avoid_recent_years": "Avoid recent years",
+    "avoid_associated_years": "Avoid years that are associated with you",
+    # date
+    "dates_are_easy": "Dates are often easy to guess",
+    "avoid_associated_dates_and_years": "Avoid dates and years that are associated with you",
+    # dictionary
+    "top10_password": "This is a top-10 common password",
+    "top100_password": "This is a top-100 common password",
+    "very_common_password": "This is a very common password",
+    "similar_to_common_password": "This is similar to a commonly used password",
+    "word_by_itself_is_easy": "A word by itself is easy to guess",
+    "names_by_themselves_are_easy": "Names and surnames by themselves are easy to guess",
+    "common_names_are_easy": "Common names and surnames are easy to guess",
+    "capitalization_doesnt_help": "Capitalization doesn't help very much",
+    "all_uppercase_is_easy": "All-uppercase is almost as easy to guess as all-lowercase",
+    "reversed_words_arent_harder": "Reversed words aren't much harder to guess",
+    "predictable_substitutions_dont_help": "Predictable substitutions like '@' instead of 'a' don't help very much"
+})
+
+# templates: (warning ID or None, tuple of suggestion IDs)
+DEFAULT_FEEDBACK = (None, ("use_a_few_words", "no_need_for_mixed_chars"))
+NO_FEEDBACK = (None, ())
+EXTRA_FEEDBACK = "add_another_word"
+
+STRAIGHT_SPATIAL_FEEDBACK = ("straight_rows_of_keys_are_easy", ("use_longer_keyboard_patterns",))
+SPATIAL_FEEDBACK = ("short_keyboard_patterns_are_easy", ("use_longer_keyboard_patterns",))
+REPEATED_CHAR_FEEDBACK = ("repeated_chars_are_easy", ("avoid_repeated_words_and_chars",))
+REPEATED_PATTERN_FEEDBACK = ("repeated_patterns_are_easy", ("avoid_repeated_words_and_chars",))
+SEQUENCE_FEEDBACK = ("sequences_are_easy", ("avoid_sequences",))
+RECENT_YEAR_FEEDBACK = ("recent_years_are_easy", ("avoid_recent_years", "avoid_associated_years"))
+DATE_FEEDBACK = ("dates_are_easy", ("avoid_associated_dates_and_years",))
+
+# english feedback of an empty password, get_feedback returns a copy of it
 default_feedback = {
     "warning": "",
-    "suggestions": [
-        "Use a few words, avoid common phrases",
-        "No need for symbols, digits, or uppercase letters"
-    ]
+    "suggestions": [MESSAGES[message_id] for message_id in DEFAULT_FEEDBACK[1]]
 }
 
 
-def get_feedback(score, sequence):
+def render_feedback(feedback_ids, messages=MESSAGES):
+    """Return the feedback dict of a template
+    :param tuple feedback_ids: (warning ID or None, tuple of suggestion IDs)
+    :param dict messages: message ID -> text
+    :rtype: dict
+    """
+    warning, suggestions = feedback_ids
+    return {
+        "warning": messages[warning] if warning is not None else "",
+        "suggestions": [messages[suggestion] for suggestion in suggestions]
+    }
+
+
+def get_feedback(score, sequence, messages=MESSAGES):
+    """Return the warning and suggestions for a password
+    :param int score:
+    :param list sequence: matches of the password
+    :param dict messages: message ID -> text, for other languages than english
+    :rtype: dict
+    """
+    return render_feedback(get_feedback_ids(score, sequence), messages)
+
+
+def get_feedback_ids(score, sequence):
+    """Return the feedback for a password as message IDs
+    :param int score:
+    :param list sequence: matches of the password
+    :rtype: tuple
+    """
     # starting feedback
     if len(sequence) == 0:
-        return default_feedback
+        return DEFAULT_FEEDBACK
 
     # no feedback if score is good or great.
     if score > 2:
-        return {
-            "warning": "",
-            "suggestions": []
-        }
+        return NO_FEEDBACK
 
     # tie feedback to the longest match for longer sequences
     longest_match = sequence[0]
     for match in sequence[1:]:
         if len(match["token"]) > len(longest_match["token"]):
             longest_match = match
-    feedback = get_match_feedback(longest_match, len(sequence) == 1)
-    extra_feedback = "Add another word or two. Uncommon words are better."
+    feedback = get_match_feedback_ids(longest_match, len(sequence) == 1)
 
-    if feedback:
-        feedback["suggestions"].insert(1, extra_feedback)
-        if "warning" not in feedback or feedback["warning"] is None:
-            feedback["warning"] = ""
-    else:
-        feedback = {
-            "warning": "",
-            "suggestions": [extra_feedback]
-        }
-
-    return feedback
+    if feedback is None:
+        return None, (EXTRA_FEEDBACK,)
+    warning, suggestions = feedback
+    return warning, suggestions[:1] + (EXTRA_FEEDBACK,) + suggestions[1:]
 
 
 def get_match_feedback(match, is_sole_match):
+    """Return the english feedback dict of a match, or None
+    :param dict match:
+    :param bool is_sole_match:
+    :rtype: dict
+    """
+    feedback = get_match_feedback_ids(match, is_sole_match)
+    return render_feedback(feedback) if feedback is not None else None
 
-    if "pattern" not in match:
-        return
 
-    elif match["pattern"] == "dictionary":
-        return get_dictionary_match_feedback(match, is_sole_match)
+def get_match_feedback_ids(match, is_sole_match):
+    """Return the feedback template of a match, or None
+    :param dict match:
+    :param bool is_sole_match:
+    :rtype: tuple
+    """
+    match_feedback = MATCH_FEEDBACK.get(match.get("pattern"))
+    if match_feedback is None:
+        return None
+    return match_feedback(match, is_sole_match)
 
-    elif match["pattern"] == "spatial":
-        if "turns" in match and match["turns"] == 1:
-            warning = "Straight rows of keys are easy to guess"
-        else:
-            warning = "Short keyboard patterns are easy to guess"
-
-        return {
-            "warning": warning,
-            "suggestions": [
-                "Use a longer keyboard pattern with more turns"
-            ]
-        }
-
-    elif match["pattern"] == "repeat":
-        if len(match["base_token"]) == 1:
-            warning = "Repeats like 'aaa' are easy to guess"
-        else:
-            warning = "Repeats like 'abcabcabc' are only slightly harder to guess than 'abc'"
-        return {
-            "warning": warning,
-            "suggestions": [
-                "Avoid repeated words and characters"
-            ]
-        }
-
-    elif match["pattern"] == "sequence":
-        return {
-            "warning": "Sequences like abc or 6543 are easy to guess",
-            "suggestions": [
-                "Avoid sequences"
-            ]
-        }
-
-    elif match["pattern"] == "regex":
-        if match["regex_name"] == "recent_year":
-            return {
-                "warning": "Recent years are easy to guess",
-                "suggestions": [
-                    "Avoid recent years",
-                    "Avoid years that are associated with you"
-                ]
-            }
-
-    elif match["pattern"] == "date":
-        return {
-            "warning": "Dates are often easy to guess",
-            "suggestions": [
-                "Avoid dates and years that are associated with you"
-            ]
-        }
 
+def _spatial_feedback(match, is_sole_match):
+    return STRAIGHT_SPATIAL_FEEDBACK if match.get("turns") == 1 else SPATIAL_FEEDBACK
+
+
+def _repeat_feedback(match, is_sole_match):
+    return REPEATED_CHAR_FEEDBACK if len(match["base_token"]) == 1 else REPEATED_PATTERN_FEEDBACK
 
-def get_dictionary_match_feedback(match, is_sole_match):
 
-    warning = ""
-    if "dictionary_name" not in match:
-        warning = ""
+def _sequence_feedback(match, is_sole_match):
+    return SEQUENCE_FEEDBACK
 
-    elif match["dictionary_name"] == "passwords":
-        if is_sole_match and \
-                (("l33t" not in match) or not match["l33t"]) and \
-                (("reversed" not in match) or not match["reversed"]):
+
+def _regex_feedback(match, is_sole_match):
+    return RECENT_YEAR_FEEDBACK if match["regex_name"] == "recent_year" else None
+
+
+def _date_feedback(match, is_sole_match):
+    return DATE_FEEDBACK
+
+
+def get_dictionary_match_feedback(match, is_sole_match):
+    """Return the english feedback dict of a dictionary match
+    :param dict match:
+    :param bool is_sole_match:
+    :rtype: dict
+    """
+    return render_feedback(get_dictionary_match_feedback_ids(match, is_sole_match))
+
+
+def get_dictionary_match_feedback_ids(match, is_sole_match):
+    """Return the feedback template of a dictionary match
+    :param dict match:
+    :param bool is_sole_match:
+    :rtype: tuple
+    """
+    warning = None
+    dictionary_name = match.get("dictionary_name")
+    l33t = match.get("l33t")
+    reversed_ = match.get("reversed")
+
+    if dictionary_name == "passwords":
+        if is_sole_match and not l33t and not reversed_:
             if match["rank"] <= 10:
-                warning = "This is a top-10 common password"
+                warning = "top10_password"
             elif match["rank"] <= 100:
-                warning = "This is a top-100 common password"
+                warning = "top100_password"
             else:
-                warning = "This is a very common password"
+                warning = "very_common_password"
         elif match["guesses_log10"] <= 4:
-            warning = "This is similar to a commonly used password"
+            warning = "similar_to_common_password"
 
-    elif match["dictionary_name"] == "english":
+    elif dictionary_name == "english":
         if is_sole_match:
-            warning = "A word by itself is easy to guess"
+            warning = "word_by_itself_is_easy"
 
-    elif match["dictionary_name"] in ["surnames", "male_names", "female_names"]:
+    elif dictionary_name in ("surnames", "male_names", "female_names"):
         if is_sole_match:
-            warning = "Names and surnames by themselves are easy to guess"
+            warning = "names_by_themselves_are_easy"
         else:
-            warning = "Common names and surnames are easy to guess"
+            warning = "common_names_are_easy"
 
-    else:
-        warning = ""
-
-    suggestions = []
+    suggestions = ()
     word = match["token"]
 
-    if re.match(scoring.START_UPPER, word):
-        suggestions.append("Capitalization doesn't help very much")
-    elif re.match(scoring.ALL_UPPER, word):
-        suggestions.append("All-uppercase is almost as easy to guess as all-lowercase")
+    if scoring.START_UPPER.match(word):
+        suggestions += ("capitalization_doesnt_help",)
+    elif scoring.ALL_UPPER.match(word):
+        suggestions += ("all_uppercase_is_easy",)
 
-    if "reversed" in match and match["reversed"] and len(match["token"]) >= 4:
-        suggestions.append("Reversed words aren't much harder to guess")
+    if reversed_ and len(word) >= 4:
+        suggestions += ("reversed_words_arent_harder",)
 
-    if "l33t" in match and match["l33t"]:
-        suggestions.append("Predictable substitutions like '@' instead of 'a' don't help very much")
+    if l33t:
+        suggestions += ("predictable_substitutions_dont_help",)
 
-    return {
-        "warning": warning,
-        "suggestions": suggestions
-    }
+    return warning, suggestions
+
+
+# pattern -> function returning the feedback template of a match, or None
+MATCH_FEEDBACK = {
+    "dictionary": get_dictionary_match_feedback_ids,
+    "spatial": _spatial_feedback,
+    "repeat": _repeat_feedback,
+    "sequence": _sequence_feedback,
+    "regex": _regex_feedback,
+    "date": _date_feedback
+}
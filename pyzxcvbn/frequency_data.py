@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""Compact binary storage for the ranked frequency lists.
+
+Layout of the file (all integers are little-endian uint32)::
+
+    header      magic "ZXFL", version, number of sections
+    directory   per section: name length, utf-8 name, word count, section offset
+    section     per list: (count + 1) word offsets, then the word table
+
+The word table holds the words of one list in rank order, utf-8 encoded and
+separated by "\\n". The offset array gives random access to the word of any
+rank straight from the memory-mapped file, and the table as a whole can be
+split into a ranked dict without a per-word Python loop.
+
+A last section, named SORTED_WORDS, holds the words of all lists once each
+in code point order, with the offset of every SORTED_BLOCK_SIZE-th word
+only. Dictionary matching bisects it in the mapped file instead of sorting
+the words of the ranked dicts on first use.
+"""
+from __future__ import absolute_import
+import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+try:
+    from collections.abc import MutableMapping, Sequence
+except ImportError:  # Python 2
+    from collections import MutableMapping, Sequence
+
+MAGIC = b"ZXFL"
+VERSION = 2
+# name of the sorted words section, which no list can have
+SORTED_WORDS = ""
+SORTED_BLOCK_SIZE = 32
+# SortedWords keeps the words of up to this many blocks decoded
+MAX_CACHED_BLOCKS = 256
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frequency_lists.bin")
+
+_HEADER = struct.Struct("<4sII")
+_UINT32 = struct.Struct("<I")
+
+
+def _uint32_array(data):
+    result = array.array("I")
+    if hasattr(result, "frombytes"):
+        result.frombytes(data)
+    else:  # Python 2
+        result.fromstring(data)
+    if sys.byteorder == "big":
+        result.byteswap()
+    return result
+
+
+def _uint32_bytes(values):
+    result = array.array("I", values)
+    if sys.byteorder == "big":
+        result.byteswap()
+    return result.tobytes() if hasattr(result, "tobytes") else result.tostring()
+
+
+def write_frequency_data(path, frequency_lists, names=None):
+    """Write ranked word lists into a binary frequency data file, followed by
+    the sorted words of all of them
+    :param str path:
+    :param dict frequency_lists: list name -> words ordered by rank
+    :param list names: list names to write, in order (default: sorted keys)
+    :return: None
+    """
+    if names is None:
+        names = sorted(frequency_lists.keys())
+    if SORTED_WORDS in names:
+        raise ValueError("list names must not be empty")
+
+    # utf-8 bytes sort in code point order, like the words
+    sorted_words = sorted(set(word for name in names for word in frequency_lists[name]))
+    lists = [frequency_lists[name] for name in names] + [sorted_words]
+    names = list(names) + [SORTED_WORDS]
+
+    encoded_names = [name.encode("utf-8") for name in names]
+    sections = []
+    for name, word_list in zip(names, lists):
+        words = [word.encode("utf-8") for word in word_list]
+        for word in words:
+            if b"\n" in word:
+                raise ValueError("word in list '{}' contains a newline".format(name))
+        offsets = [0]
+        for word in words:
+            offsets.append(offsets[-1] + len(word) + 1)
+        if name == SORTED_WORDS:
+            # the first word of each block, and the end
+            offsets = offsets[::SORTED_BLOCK_SIZE] + ([offsets[-1]] if len(words) % SORTED_BLOCK_SIZE else [])
+        sections.append((len(words), _uint32_bytes(offsets) + b"\n".join(words) + b"\n"))
+
+    directory = b""
+    position = _HEADER.size + sum(3 * _UINT32.size + len(name) for name in encoded_names)
+    for encoded_name, (count, section) in zip(encoded_names, sections):
+        directory += _UINT32.pack(len(encoded_name)) + encoded_name
+        directory += _UINT32.pack(count) + _UINT32.pack(position)
+        position += len(section)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(names)))
+        f.write(directory)
+        for _, section in sections:
+            f.write(section)
+
+
+_default_data = []
+
+
+def default_frequency_data():
+    """Return the FrequencyData of the bundled data file, or None when the file
+    has not been built (see scripts/build_frequency_data.py)
+    :rtype: FrequencyData
+    """
+    if not _default_data:
+        _default_data.append(FrequencyData() if os.path.exists(DEFAULT_PATH) else None)
+    return _default_data[0]
+
+
+class FrequencyList(Sequence):
+    """Words of one ranked list, read lazily from a frequency data buffer.
+    Index ``r`` holds the word of rank ``r + 1``, like the original lists.
+    """
+
+    def __init__(self, name, buf, count, offset, frequency_data=None):
+        self.name = name
+        self.frequency_data = frequency_data
+        self._buf = buf
+        self._count = count
+        self._offset_start = offset
+        self._table = offset + (count + 1) * _UINT32.size
+        self._offsets = None
+
+    def __len__(self):
+        return self._count
+
+    def _word_offsets(self):
+        if self._offsets is None:
+            self._offsets = _uint32_array(self._buf[self._offset_start:self._table])
+        return self._offsets
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("frequency list index out of range")
+        offsets = self._word_offsets()
+        start = self._table + offsets[index]
+        end = self._table + offsets[index + 1] - 1
+        return self._buf[start:end].decode("utf-8")
+
+    def words(self):
+        """Return all words in rank order
+        :rtype: list
+        """
+        if self._count == 0:
+            return []
+        end = self._table + self._word_offsets()[self._count] - 1
+        return self._buf[self._table:end].decode("utf-8").split("\n")
+
+    def ranked_dict(self):
+        """Return ranked dict of the list, same as matching.build_ranked_dict
+        :rtype: dict
+        """
+        ranked_dict = RankedDict(zip(self.words(), range(1, self._count + 1)))
+        ranked_dict.frequency_data = self.frequency_data
+        return ranked_dict
+
+    @property
+    def nbytes(self):
+        """Size of the list in the data file"""
+        return (self._count + 1) * _UINT32.size + self._word_offsets()[self._count]
+
+
+class SortedWords(object):
+    """The SORTED_WORDS section. find() bisects it in the data file: first the
+    first words of its blocks, kept in memory, then the words of one block,
+    decoded and kept for the next finds in it.
+    """
+
+    def __init__(self, buf, count, offset):
+        self._buf = buf
+        self._count = count
+        self._offset_start = offset
+        self._table = offset + (self._block_count() + 1) * _UINT32.size
+        self._offsets = None
+        self._heads = None
+        self._blocks = {}  # block -> its words, decoded
+
+    def __len__(self):
+        return self._count
+
+    def _block_count(self):
+        return (self._count + SORTED_BLOCK_SIZE - 1) // SORTED_BLOCK_SIZE
+
+    def _block_offsets(self):
+        if self._offsets is None:
+            self._offsets = _uint32_array(self._buf[self._offset_start:self._table])
+        return self._offsets
+
+    def _load_block(self, block):
+        if len(self._blocks) >= MAX_CACHED_BLOCKS:
+            self._blocks.clear()
+        offsets = self._block_offsets()
+        start = self._table + offsets[block]
+        words = self._buf[start:self._table + offsets[block + 1] - 1].decode("utf-8").split("\n")
+        self._blocks[block] = words
+        return words
+
+    def _load_heads(self):
+        buf = self._buf
+        heads = []
+        for offset in self._block_offsets()[:-1]:
+            start = self._table + offset
+            heads.append(buf[start:buf.find(b"\n", start)].decode("utf-8"))
+        self._heads = heads
+        return heads
+
+    def find(self, word, lo=0):
+        """Return the insertion point of word, and the word there or None at
+        the end
+        :param str word:
+        :param int lo: index the insertion point is known to be at or after
+        :rtype: tuple
+        """
+        heads = self._heads or self._load_heads()
+        block = bisect.bisect_right(heads, word, lo // SORTED_BLOCK_SIZE) - 1
+        if block < 0:
+            return 0, heads[0] if heads else None
+        words = self._blocks.get(block) or self._load_block(block)
+        k = bisect.bisect_left(words, word)
+        if k < len(words):
+            return block * SORTED_BLOCK_SIZE + k, words[k]
+        return block * SORTED_BLOCK_SIZE + k, heads[block + 1] if block + 1 < len(heads) else None
+
+    def words(self):
+        """Return all words in order
+        :rtype: list
+        """
+        if self._count == 0:
+            return []
+        end = self._table + self._block_offsets()[-1] - 1
+        return self._buf[self._table:end].decode("utf-8").split("\n")
+
+    def max_word_length(self):
+        """Return the length of the longest word
+        :rtype: int
+        """
+        return max([len(word) for word in self.words()] + [0])
+
+
+class RankedDict(dict):
+    """Ranked dict of a list of a FrequencyData, whose sorted_words hold its words"""
+
+    __slots__ = ("frequency_data",)
+
+
+class FrequencyData(object):
+    """Read-only view of a binary frequency data file.
+    The file is memory-mapped so that nothing is parsed until a list is used,
+    and forked worker processes share the pages.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, mmap.error):
+                # empty file or a filesystem that can't be mapped
+                self._buf = f.read()
+
+        magic, version, count = _HEADER.unpack(self._buf[:_HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a frequency data file (version {})".format(path, VERSION))
+
+        self.lists = {}
+        self.names = []
+        self.sorted_words = None
+        cursor = _HEADER.size
+        for _ in range(count):
+            name_length = _UINT32.unpack(self._buf[cursor:cursor + 4])[0]
+            cursor += 4
+            name = self._buf[cursor:cursor + name_length].decode("utf-8")
+            cursor += name_length
+            word_count = _UINT32.unpack(self._buf[cursor:cursor + 4])[0]
+            offset = _UINT32.unpack(self._buf[cursor + 4:cursor + 8])[0]
+            cursor += 8
+            if name == SORTED_WORDS:
+                self.sorted_words = SortedWords(self._buf, word_count, offset)
+            else:
+                self.names.append(name)
+                self.lists[name] = FrequencyList(name, self._buf, word_count, offset, self)
+
+    def __getitem__(self, name):
+        return self.lists[name]
+
+    def __contains__(self, name):
+        return name in self.lists
+
+
+class LazyRankedDictionaries(MutableMapping):
+    """Mapping of dictionary name -> ranked dict whose entries are built on
+    first access. ``sources`` is a list of (name, callable returning the
+    ranked dict) pairs; iteration follows its order.
+
+    select() narrows the mapping to some of the sources, whose ranked dicts
+    are then the only ones ever built; the others can be selected again.
+    """
+
+    def __init__(self, sources):
+        self._sources = dict(sources)
+        self._order = [name for name, _ in sources]
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self._order:
+            raise KeyError(name)
+        if name not in self._loaded:
+            self._loaded[name] = self._sources[name]()
+        return self._loaded[name]
+
+    def __setitem__(self, name, ranked_dict):
+        if name not in self._order:
+            self._order.append(name)
+        self._loaded[name] = ranked_dict
+
+    def __delitem__(self, name):
+        if name not in self._order:
+            raise KeyError(name)
+        self._order.remove(name)
+        self._loaded.pop(name, None)
+        self._sources.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._order
+
+    def __iter__(self):
+        return iter(list(self._order))
+
+    def __len__(self):
+        return len(self._order)
+
+    def is_loaded(self, name):
+        return name in self._order and name in self._loaded
+
+    def add_source(self, name, load):
+        """Add or replace a dictionary built by ``load`` on first access
+        :param str name:
+        :param callable load: returns the ranked dict
+        :return: None
+        """
+        if name not in self._order:
+            self._order.append(name)
+        self._sources[name] = load
+        self._loaded.pop(name, None)
+
+    def sources(self):
+        """Return the names of all dictionaries that can be selected
+        :rtype: list
+        """
+        return self._order + sorted(name for name in self._sources if name not in self._order)
+
+    def select(self, names):
+        """Keep only the named dictionaries, in the given order. Ranked dicts
+        of the dropped ones are released and rebuilt if selected again, those
+        set without a source are deleted.
+        :param list names:
+        :return: None
+        """
+        names = list(names)
+        for name in names:
+            if name not in self._sources and name not in self._order:
+                raise KeyError(name)
+        for name in self._order:
+            if name not in names:
+                self._loaded.pop(name, None)
+        self._order = names
+
+    def memory_usage(self):
+        """Return the approximate size in bytes of every built ranked dict,
+        its words and ranks included
+        :rtype: dict
+        """
+        return dict((name, ranked_dict_size(self._loaded[name]))
+                    for name in self._order if name in self._loaded)
+
+
+def ranked_dict_size(ranked_dict):
+    """Return the approximate size in bytes of a ranked dict and its items
+    :param dict ranked_dict:
+    :rtype: int
+    """
+    return sys.getsizeof(ranked_dict) + sum(
+        sys.getsizeof(word) + sys.getsizeof(rank) for word, rank in ranked_dict.items())
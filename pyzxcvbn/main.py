@@ -1,31 +1,333 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
+import collections
 import datetime
+import timeit
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
 from . import matching
+from . import profiling
 from . import scoring
 from . import time_estimates
-from . import feedback
+from .feedback import MESSAGES, get_feedback
+from .match_types import BruteforceMatch
 
 
-def zxcvbn(password, user_inputs=()):
-    """Measure strength of the password
-    :param str password:
+def sanitize_user_inputs(user_inputs):
+    """Return user inputs as a list of lowercased strings
     :param list user_inputs:
-    :rtype: dict
+    :rtype: list
     """
-    start = datetime.datetime.now()
-    # reset the user inputs matcher on a per-request basis to keep things stateless
     sanitized_inputs = []
     for arg in user_inputs:
         if isinstance(arg, (str, int, bool)):
             sanitized_inputs.append(str(arg).lower())
-    matching.set_user_input_dictionary(sanitized_inputs)
-    matches = matching.omnimatch(password)
-    result = scoring.most_guessable_match_sequence(password, matches)
-    result["calc_time"] = datetime.datetime.now() - start
+    return sanitized_inputs
+
+
+def _scored_prefix(password, max_length):
+    """Return the part of password that is matched and searched, see zxcvbn
+    :param str password:
+    :param int max_length:
+    :rtype: str
+    """
+    if max_length is None:
+        return password
+    if max_length < 0:
+        raise ValueError("max_length must not be negative: {}".format(max_length))
+    return password[:max_length]
+
+
+def _match_budget(max_length):
+    """Return how many matches the guess search takes, None for all of them.
+    The budget only applies along with max_length, so scores are exact
+    without it.
+    :param int max_length:
+    :rtype: int
+    """
+    return None if max_length is None else matching.MAX_MATCHES
+
+
+def _feedback_messages(feedback):
+    """Return the message table for zxcvbn's feedback option, None to skip it
+    :param feedback: True or None for MESSAGES, False, or a dict of
+        translated messages
+    :rtype: dict
+    """
+    if feedback is False:
+        return None
+    if feedback is True or feedback is None:
+        return MESSAGES
+    if not isinstance(feedback, Mapping):
+        raise TypeError("feedback must be a bool or a dict of messages, not %s" % type(feedback).__name__)
+    return feedback
+
+
+def _zxcvbn(password, ranked_dictionaries, profile=None, max_length=None, feedback=True):
+    prefix = _scored_prefix(password, max_length)
+    messages = _feedback_messages(feedback)
+    if profile is None:
+        matches = matching.omnimatch(prefix, ranked_dictionaries, _max_matches=_match_budget(max_length))
+        result = scoring.most_guessable_match_sequence(prefix, matches)
+        return _with_estimates(scoring.with_bruteforce_remainder(result, password), messages=messages)
+
+    report = profiling.Profile()
+    matches = matching.omnimatch(prefix, ranked_dictionaries, _profile=report,
+                                 _max_matches=_match_budget(max_length))
+    start = profiling.perf_counter_ns()
+    result = scoring.most_guessable_match_sequence(prefix, matches)
+    result = scoring.with_bruteforce_remainder(result, password)
+    report.add("most_guessable_match_sequence", profiling.perf_counter_ns() - start)
+    result = _with_estimates(result, report, messages)
+    profile(report)
+    return result
+
+
+def _with_estimates(result, _profile=None, messages=MESSAGES):
+    start = profiling.perf_counter_ns() if _profile is not None else None
+    # the match objects stay internal, the result holds plain dicts
+    result["sequence"] = [match.to_dict() for match in result["sequence"]]
     attack_time = time_estimates.estimate_attack_times(result["guesses"])
     for prop, val in attack_time.items():
         result[prop] = val
-    result["feedback"] = feedback.get_feedback(result["score"], result["sequence"])
+    if _profile is not None:
+        _profile.add("estimate_attack_times", profiling.perf_counter_ns() - start)
+        start = profiling.perf_counter_ns()
+    if messages is None:
+        return result
+    result["feedback"] = get_feedback(result["score"], result["sequence"], messages)
+    if _profile is not None:
+        _profile.add("get_feedback", profiling.perf_counter_ns() - start)
+    return result
+
+
+def zxcvbn(password, user_inputs=(), profile=None, max_length=None, feedback=True):
+    """Measure strength of the password.
+    With max_length, only the first max_length characters are matched and
+    searched, which bounds the time taken by any input, and each character
+    past them counts as a bruteforce guess. A longer password then never
+    scores lower than its prefix.
+    :param str password:
+    :param list user_inputs:
+    :param callable profile: called with the profiling.Profile of the call
+    :param int max_length: characters scored exactly (default: all)
+    :param feedback: False to leave out the "feedback" key, or a dict of the
+        feedback.MESSAGES IDs -> texts in another language (default: True)
+    :rtype: dict
+    """
+    start = datetime.datetime.now()
+    # user inputs are matched through a per-call dictionary mapping to keep things stateless
+    ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+    result = _zxcvbn(password, ranked_dictionaries, profile, max_length, feedback)
+    result["calc_time"] = datetime.datetime.now() - start
     return result
+
+
+# zxcvbn_score runs the matchers cheapest first, so that a match of the whole
+# password can settle a failed min_score before the dictionaries are searched
+SCORE_MATCHER_ORDER = (matching.sequence_match, matching.regex_match, matching.date_match,
+                       matching.spatial_match, matching.repeat_match, matching.dictionary_match,
+                       matching.reverse_dictionary_match, matching.l33t_match)
+
+
+def zxcvbn_score(password, user_inputs=(), max_length=None, min_score=None):
+    """Return only the score zxcvbn gives the password, without the attack
+    times, the feedback and the conversion of the matches to dicts.
+    For a policy that only checks score >= min_score, pass min_score: every
+    score below it is then returned as min_score - 1. The guesses of the
+    password as bruteforce or as any one match bound those of the search, so
+    matching stops once they fall short of min_score, which settles short
+    and common passwords without the search.
+    :param str password:
+    :param list user_inputs:
+    :param int max_length: see zxcvbn
+    :param int min_score: scores below it are returned as min_score - 1
+    :rtype: int
+    """
+    ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+    prefix = _scored_prefix(password, max_length)
+    # an upper bound of the guesses of zxcvbn, past the float range as infinity
+    try:
+        remainder_guesses = 1
+        if len(prefix) < len(password):
+            remainder_guesses = scoring.bruteforce_guesses(
+                BruteforceMatch(len(prefix), len(password) - 1, password[len(prefix):]))
+        bound = scoring.INFINITY
+        if prefix:
+            bruteforce = BruteforceMatch(0, len(prefix) - 1, prefix)
+            bound = (scoring.estimate_guesses(bruteforce, prefix) + 1) * remainder_guesses
+    except OverflowError:
+        remainder_guesses = bound = scoring.INFINITY
+
+    matches = []
+    matchers = sorted(matching.match_functions(ranked_dictionaries),
+                      key=lambda matcher: SCORE_MATCHER_ORDER.index(getattr(matcher, "func", matcher)))
+    for matcher in matchers:
+        if min_score is not None and time_estimates.guesses_to_score(bound) < min_score:
+            return min_score - 1
+        for match in matcher(prefix):
+            matches.append(match)
+            if match.i == 0 and match.j == len(prefix) - 1:
+                bound = min(bound, (scoring.estimate_guesses(match, prefix) + 1) * remainder_guesses)
+    if min_score is not None and time_estimates.guesses_to_score(bound) < min_score:
+        return min_score - 1
+
+    matches.sort(key=lambda x: (x.i, x.j))
+    result = scoring.most_guessable_match_sequence(prefix, matches[:_match_budget(max_length)])
+    result = scoring.with_bruteforce_remainder(result, password)
+    score = time_estimates.guesses_to_score(result["guesses"])
+    return score if min_score is None else max(score, min_score - 1)
+
+
+class BatchStats(object):
+    """Aggregate counters of a zxcvbn_many run, updated as results are yielded"""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0  # seconds spent scoring, excluding the consumer's time
+
+    @property
+    def throughput(self):
+        """Passwords scored per second"""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return "BatchStats(count={}, elapsed={:.3f}s, throughput={:.1f}/s)".format(
+            self.count, self.elapsed, self.throughput)
+
+
+def zxcvbn_many(passwords, user_inputs=(), stats=None, profile=None, max_length=None, feedback=True):
+    """Measure strength of many passwords sharing the same user inputs.
+    The user input dictionary is built once for the whole batch; results are
+    yielded in order, each the same as zxcvbn(password, user_inputs).
+    :param iterable passwords:
+    :param list user_inputs:
+    :param BatchStats stats: updated with count and elapsed time as results are yielded
+    :param callable profile: called with the profiling.Profile of each password
+    :param int max_length: see zxcvbn
+    :param feedback: see zxcvbn
+    :rtype: generator
+    """
+    timer = timeit.default_timer
+    ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+    for password in passwords:
+        start = timer()
+        result = _zxcvbn(password, ranked_dictionaries, profile, max_length, feedback)
+        elapsed = timer() - start
+        result["calc_time"] = datetime.timedelta(seconds=elapsed)
+        if stats is not None:
+            stats.count += 1
+            stats.elapsed += elapsed
+        yield result
+
+
+# match functions whose matches depend on nothing but their own token
+TOKEN_MATCHERS = (matching.dictionary_match, matching.reverse_dictionary_match, matching.l33t_match)
+
+
+def _signature(match):
+    # what a match found again in an edited password must equal to be the same
+    return sorted((k, v) for k, v in match.items() if k not in ("guesses", "guesses_log10"))
+
+
+def _first_change(previous, matches, limit):
+    """Return the first position below limit where the matches ending there
+    differ, or limit"""
+    columns = collections.defaultdict(lambda: ([], []))
+    for side, side_matches in enumerate([previous, matches]):
+        for match in side_matches:
+            if match.j < limit:
+                columns[match.j][side].append(_signature(match))
+    return min([j for j, (before, after) in columns.items() if before != after] + [limit])
+
+
+class ZxcvbnSession(object):
+    """Measure strength of successive versions of a password, such as the
+    contents of a password field after each keystroke.
+
+    update(password) gives the same result as zxcvbn(password, user_inputs),
+    but only looks for dictionary matches around the characters that changed
+    and only extends the guess search from the first column whose matches did.
+
+        session = ZxcvbnSession(user_inputs=["alice"])
+        for password in ["p", "pa", "pas", "pass"]:
+            result = session.update(password)
+    """
+
+    def __init__(self, user_inputs=(), max_length=None):
+        """
+        :param list user_inputs:
+        :param int max_length: see zxcvbn
+        """
+        self.password = ""  # the scored prefix
+        self.max_length = max_length
+        self._ranked_dictionaries = matching.with_user_input_dictionary(sanitize_user_inputs(user_inputs))
+        self._base_analyses = {}
+        self._matchers = matching.match_functions(self._ranked_dictionaries, self._base_analyses)
+        self._matches = [[] for _ in self._matchers]
+        self._search = {}
+        self._max_token_length = max(
+            [word_list.max_length for word_list in matching.sorted_word_lists(self._ranked_dictionaries)] + [0])
+
+    def update(self, password):
+        """Measure strength of the new version of the password
+        :param str password:
+        :rtype: dict
+        """
+        start = timeit.default_timer()
+        full_password = password
+        password = _scored_prefix(password, self.max_length)
+        previous = self.password
+        edit = 0
+        while edit < min(len(previous), len(password)) and previous[edit] == password[edit]:
+            edit += 1
+        if len(password.lower()) != len(password) or len(previous.lower()) != len(previous):
+            edit = 0  # match positions refer to the lowercased password
+
+        # a match covering all of the previous password ends at edit - 1, so
+        # that column is always redone
+        valid = max(edit - 1, 0)
+        matches_by_matcher = []
+        for matcher, previous_matches in zip(self._matchers, self._matches):
+            if getattr(matcher, "func", matcher) in TOKEN_MATCHERS:
+                matches = self._token_matches(matcher, password, previous, previous_matches, edit)
+            else:
+                # runs such as spatial walks or repeats may grow past the edit
+                matches = matcher(password)
+                valid = _first_change(previous_matches, matches, valid)
+            matches_by_matcher.append(matches)
+
+        matches = sorted(
+            [match for matches in matches_by_matcher for match in matches],
+            key=lambda x: (x.i, x.j))[:_match_budget(self.max_length)]
+        self._search["valid"] = valid
+        result = scoring.most_guessable_match_sequence(password, matches, _search=self._search)
+        self.password = password
+        self._matches = matches_by_matcher
+        result = _with_estimates(scoring.with_bruteforce_remainder(result, full_password))
+        result["calc_time"] = datetime.timedelta(seconds=timeit.default_timer() - start)
+        return result
+
+    def _token_matches(self, matcher, password, previous, previous_matches, edit):
+        matches = []
+        for match in previous_matches:
+            if match.j < edit:
+                # guesses of a match covering the whole password differ from
+                # those of a submatch
+                if match.i == 0 and match.j in (len(previous) - 1, len(password) - 1):
+                    match = match.copy()
+                    match.guesses = None
+                    match.guesses_log10 = None
+                matches.append(match)
+        # no token is longer than the longest dictionary word
+        window = max(edit - self._max_token_length, 0)
+        for match in matcher(password[window:]):
+            if match.j + window >= edit:
+                match.i += window
+                match.j += window
+                matches.append(match)
+        return matches
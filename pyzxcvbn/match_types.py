@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Match objects, one class per pattern.
+
+omnimatch and the guess search pass around many short-lived matches. These
+classes hold them in __slots__ instead of a dict each, which takes less than
+half the memory and is faster to create and to read by attribute.
+
+Outside code sees the same keys as before: zxcvbn() returns every match of
+its sequence converted with to_dict(), and the classes also support reading
+and assigning keys (match["token"], "l33t" in match, match.get("sub")) for
+code written against the dicts. A key is present once its slot is set; the
+guesses keys appear when estimate_guesses has filled them in.
+"""
+from __future__ import absolute_import
+
+_UNSET = object()
+# slots that start out as None, standing for keys not yet set
+_ESTIMATES = frozenset(["guesses", "guesses_log10"])
+
+
+class Match(object):
+    """Base of the match classes, holding the fields of every pattern"""
+
+    __slots__ = ("i", "j", "token", "guesses", "guesses_log10")
+    pattern = None
+    # key order of to_dict
+    FIELDS = ("i", "j", "token", "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token):
+        self.i = i
+        self.j = j
+        self.token = token
+        self.guesses = None
+        self.guesses_log10 = None
+
+    def _get(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is not None or key not in _ESTIMATES:
+                return value
+        elif key == "pattern" and self.pattern is not None:
+            return self.pattern
+        return _UNSET
+
+    def __getitem__(self, key):
+        value = self._get(key)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self._get(key) is not _UNSET
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        return default if value is _UNSET else value
+
+    def items(self):
+        items = [("pattern", self.pattern)] if self.pattern is not None else []
+        for key in self.FIELDS:
+            value = self._get(key)
+            if value is not _UNSET:
+                items.append((key, value))
+        return items
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.items())
+
+    def to_dict(self):
+        """Return the match as a plain dict, as zxcvbn() returns it
+        :rtype: dict
+        """
+        return dict(self.items())
+
+    def copy(self):
+        """Return a shallow copy of the match
+        :rtype: Match
+        """
+        match = self.__class__.__new__(self.__class__)
+        for key in self.FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                setattr(match, key, value)
+        return match
+
+    def __eq__(self, other):
+        if isinstance(other, Match):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.to_dict())
+
+
+class DictionaryMatch(Match):
+    """A ranked dictionary word, possibly reversed or with l33t substitutions.
+    dictionary_guesses sets base_guesses, uppercase_variations and l33t_variations.
+    """
+
+    __slots__ = ("matched_word", "rank", "dictionary_name", "reversed", "l33t", "sub", "sub_display",
+                 "base_guesses", "uppercase_variations", "l33t_variations")
+    pattern = "dictionary"
+    FIELDS = ("i", "j", "token", "matched_word", "rank", "dictionary_name", "reversed", "l33t", "sub",
+              "sub_display", "base_guesses", "uppercase_variations", "l33t_variations",
+              "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, matched_word, rank, dictionary_name, reversed=False):
+        Match.__init__(self, i, j, token)
+        self.matched_word = matched_word
+        self.rank = rank
+        self.dictionary_name = dictionary_name
+        self.reversed = reversed
+
+
+class SpatialMatch(Match):
+    """A walk on a keyboard graph"""
+
+    __slots__ = ("graph", "turns", "shifted_count")
+    pattern = "spatial"
+    FIELDS = ("i", "j", "token", "graph", "turns", "shifted_count", "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, graph, turns, shifted_count):
+        Match.__init__(self, i, j, token)
+        self.graph = graph
+        self.turns = turns
+        self.shifted_count = shifted_count
+
+
+class RepeatMatch(Match):
+    """A base token repeated, such as "abcabc" """
+
+    __slots__ = ("base_token", "base_guesses", "base_matches", "repeat_count")
+    pattern = "repeat"
+    FIELDS = ("i", "j", "token", "base_token", "base_guesses", "base_matches", "repeat_count",
+              "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, base_token, base_guesses, base_matches, repeat_count):
+        Match.__init__(self, i, j, token)
+        self.base_token = base_token
+        self.base_guesses = base_guesses
+        self.base_matches = base_matches
+        self.repeat_count = repeat_count
+
+
+class SequenceMatch(Match):
+    """A run of consecutive characters of a sequence, such as "abcd" or "9876" """
+
+    __slots__ = ("sequence_name", "sequence_space", "ascending")
+    pattern = "sequence"
+    FIELDS = ("i", "j", "token", "sequence_name", "sequence_space", "ascending", "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, sequence_name, sequence_space, ascending):
+        Match.__init__(self, i, j, token)
+        self.sequence_name = sequence_name
+        self.sequence_space = sequence_space
+        self.ascending = ascending
+
+
+class RegexMatch(Match):
+    """A token matching one of the matching.REGEXEN; a recent_year match
+    also has the year as an int
+    """
+
+    __slots__ = ("regex_name", "year")
+    pattern = "regex"
+    FIELDS = ("i", "j", "token", "regex_name", "year", "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, regex_name, year=None):
+        Match.__init__(self, i, j, token)
+        self.regex_name = regex_name
+        if year is not None:
+            self.year = year
+
+
+class DateMatch(Match):
+    """A date, with or without separators. has_full_year is only set on
+    converted match dicts that have it"""
+
+    __slots__ = ("separator", "year", "month", "day", "has_full_year")
+    pattern = "date"
+    FIELDS = ("i", "j", "token", "separator", "year", "month", "day", "has_full_year",
+              "guesses", "guesses_log10")
+
+    def __init__(self, i, j, token, separator, year, month, day):
+        Match.__init__(self, i, j, token)
+        self.separator = separator
+        self.year = year
+        self.month = month
+        self.day = day
+
+
+class BruteforceMatch(Match):
+    """A stretch of the password not covered by any other match"""
+
+    __slots__ = ()
+    pattern = "bruteforce"
+
+
+MATCH_CLASSES = dict((cls.pattern, cls) for cls in [
+    DictionaryMatch, SpatialMatch, RepeatMatch, SequenceMatch, RegexMatch, DateMatch, BruteforceMatch
+])
+
+
+def as_match(match):
+    """Return match as a Match object, converting a dict of match keys.
+    Keys that the pattern has no field for are left out
+    :param dict match:
+    :rtype: Match
+    """
+    if isinstance(match, Match):
+        return match
+    cls = MATCH_CLASSES.get(match.get("pattern"), Match)
+    converted = cls.__new__(cls)
+    converted.guesses = None
+    converted.guesses_log10 = None
+    for key, value in match.items():
+        if key in cls.FIELDS:
+            setattr(converted, key, value)
+    return converted
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
+import bisect
+import collections
+import functools
 import re
 import math
+import threading
 
 from pyzxcvbn import scoring
+from . import frequency_data
+from . import profiling
+from .match_types import DictionaryMatch, SpatialMatch, RepeatMatch, SequenceMatch, RegexMatch, DateMatch
 from .adjacency_graphs import adjacency_graphs
-from .frequency_lists import frequency_lists
-from six.moves import filter
 from six.moves import range
 
 
@@ -23,13 +28,28 @@ def build_ranked_dict(ordered_list):
         i += 1
     return result
 
-RANKED_DICTIONARIES = {
-    "passwords": build_ranked_dict(frequency_lists["passwords"]),
-    "english": build_ranked_dict(frequency_lists["english"]),
-    "surnames": build_ranked_dict(frequency_lists["surnames"]),
-    "male_names": build_ranked_dict(frequency_lists["male_names"]),
-    "female_names": build_ranked_dict(frequency_lists["female_names"])
-}
+
+def frequency_list_loader(name):
+    """Return a function building the ranked dict of a bundled frequency list
+    :param str name:
+    :rtype: function
+    """
+    def load():
+        data = frequency_data.default_frequency_data()
+        if data is not None:
+            return data[name].ranked_dict()
+        # binary data file not built, fall back to the python source
+        from .frequency_lists import frequency_lists
+        return build_ranked_dict(frequency_lists[name])
+    return load
+
+
+FREQUENCY_LIST_NAMES = ["passwords", "english", "surnames", "male_names", "female_names"]
+
+# ranked dicts are built on first use, not at import
+RANKED_DICTIONARIES = frequency_data.LazyRankedDictionaries(
+    [(name, frequency_list_loader(name)) for name in FREQUENCY_LIST_NAMES]
+)
 
 GRAPHS = {
     "qwerty": adjacency_graphs["qwerty"],
@@ -60,15 +80,25 @@ L33T_TABLE = {
 }
 
 REGEXEN = {
-    "alphanumeric": "[a-zA-Z0-9]{2,}",
-    "alpha":        "[a-zA-Z]{2,}",
-    "alpha_lower":  "[a-z]{2,}",
-    "alpha_upper":  "[A-Z]{2,}",
-    "digits":       "\d{2,}",
-    "symbols":      "[\W_]{2,}",  # includes non-latin unicode chars
-    "recent_year":  "19\d\d|200\d|201\d",
+    "alphanumeric": re.compile(r"[a-zA-Z0-9]{2,}"),
+    "alpha":        re.compile(r"[a-zA-Z]{2,}"),
+    "alpha_lower":  re.compile(r"[a-z]{2,}"),
+    "alpha_upper":  re.compile(r"[A-Z]{2,}"),
+    "digits":       re.compile(r"\d{2,}"),
+    "symbols":      re.compile(r"[\W_]{2,}"),  # includes non-latin unicode chars
+    "recent_year":  re.compile(r"19\d\d|200\d|201\d"),
 }
 
+# regex_match scans the password for these once, they can be replaced in REGEXEN
+DEFAULT_REGEXEN = dict(REGEXEN)
+
+# splits a password into runs of one class of characters: 1 lowercase,
+# 2 uppercase, 3 ascii digits, 4 other digits, 5 symbols. The char class
+# regexen match the runs at least 2 long of a class (alpha_lower,
+# alpha_upper, symbols) or of adjacent runs of several (alphanumeric 1-3,
+# alpha 1-2, digits 3-4).
+CHAR_CLASS_RUNS_RX = re.compile(r"([a-z]+)|([A-Z]+)|([0-9]+)|((?:(?![0-9])\d)+)|([\W_]+)")
+
 REGEX_PRECEDENCE = {
     "alphanumeric": 0,
     "alpha":        1,
@@ -131,27 +161,232 @@ def mod(n, m):
     return ((n % m) + m) % m
 
 
-def omnimatch(password):
-    """Apply all match functions
-    :param str password:
+def match_functions(_ranked_dictionaries=RANKED_DICTIONARIES, _base_analyses=None):
+    """Return the match functions applied by omnimatch, in order
+    :param dict _ranked_dictionaries: see with_user_input_dictionary
+    :param dict _base_analyses: see repeat_match
     :rtype: list
     """
-    matches_all = []
-    matchers = [
-        dictionary_match,
-        reverse_dictionary_match,
-        l33t_match,
+    return [
+        functools.partial(dictionary_match, _ranked_dictionaries=_ranked_dictionaries),
+        functools.partial(reverse_dictionary_match, _ranked_dictionaries=_ranked_dictionaries),
+        functools.partial(l33t_match, _ranked_dictionaries=_ranked_dictionaries),
         spatial_match,
-        repeat_match,
+        functools.partial(repeat_match, _ranked_dictionaries=_ranked_dictionaries,
+                          _base_analyses=_base_analyses),
         sequence_match,
         regex_match,
         date_match
     ]
 
-    for matcher in matchers:
-        matches = matcher(password)
+
+# size budget of the guess search input when zxcvbn's max_length is given:
+# at most this many matches are searched. It does not bound the work of the
+# matchers themselves, max_length does. Without max_length every match is
+# searched, as dropping some can raise the guesses.
+MAX_MATCHES = 5000
+
+
+def omnimatch(password, _ranked_dictionaries=RANKED_DICTIONARIES, _base_analyses=None, _profile=None,
+              _max_matches=None):
+    """Apply all match functions. Every matcher runs on the whole password;
+    only then are the matches cut down to _max_matches, if given, which
+    bounds the guess search but not the matching. Pass a prefix of the
+    password, as zxcvbn's max_length does, to bound the matching too.
+    :param str password:
+    :param dict _ranked_dictionaries: see with_user_input_dictionary
+    :param dict _base_analyses: see repeat_match
+    :param profiling.Profile _profile: gets the time spent in each match function
+    :param int _max_matches: keep the matches starting earliest up to this many (default: all)
+    :rtype: list
+    """
+    matches_all = []
+    for matcher in match_functions(_ranked_dictionaries, _base_analyses):
+        if _profile is None:
+            matches = matcher(password)
+        else:
+            start = profiling.perf_counter_ns()
+            matches = matcher(password)
+            _profile.add(getattr(matcher, "func", matcher).__name__, profiling.perf_counter_ns() - start)
         matches_all += matches
-    return sorted(matches_all, key=lambda x: (x['i'], x['j']))
+    if _profile is not None:
+        _profile.count_matches(matches_all)
+    matches_all.sort(key=lambda x: (x.i, x.j))
+    # the rest of the password is still covered by bruteforce matches
+    if _max_matches is not None:
+        del matches_all[_max_matches:]
+    return matches_all
+
+
+# SortedWordList remembers the lookups of tokens up to this long, where most
+# walks end, keeping at most MAX_SHORT_TOKENS of them
+SHORT_TOKEN_LENGTH = 3
+MAX_SHORT_TOKENS = 20000
+
+
+class SortedWordList(object):
+    """The words of several ranked dicts in one sorted list.
+
+    The words starting with a token follow its insertion point in the list, so
+    walking password[i:j+1] for growing j stops as soon as the token can't
+    start any dictionary word. Dicts read from the same frequency data file
+    are searched in its sorted words, straight from the mapped file; words
+    may be in there without being in one of the dicts, which only lets a walk
+    go on longer. Other dicts get a list of their words sorted on creation,
+    which holds the strings of the ranked dicts.
+    """
+
+    def __init__(self, ranked_dictionaries):
+        """
+        :param list ranked_dictionaries: (dictionary_name, ranked_dict) pairs
+        """
+        self.dictionaries = list(ranked_dictionaries)
+        data = sorted_words_source(self.dictionaries)
+        if data is not None:
+            self.words = data.sorted_words
+            self._find = self.words.find
+        else:
+            words = set()
+            for _, ranked_dict in self.dictionaries:
+                words.update(ranked_dict)
+            self.words = sorted(words)
+            self._find = self._find_in_list
+        self._max_length = None
+        self._short_tokens = {}  # token -> lookup(token)
+
+    @property
+    def max_length(self):
+        """Length of the longest word"""
+        if self._max_length is None:
+            if isinstance(self.words, list):
+                self._max_length = max([len(word) for word in self.words] + [0])
+            else:
+                self._max_length = self.words.max_word_length()
+        return self._max_length
+
+    def lookup(self, token, lo=0):
+        """Return the insertion point of token in words, and True if token is
+        a word, False if it only starts one, None otherwise
+        :param str token:
+        :param int lo: insertion point of a prefix of token, to search from
+        :rtype: tuple
+        """
+        if len(token) > SHORT_TOKEN_LENGTH:
+            return self._search(token, lo)
+        short_tokens = self._short_tokens
+        entry = short_tokens.get(token)
+        if entry is None:
+            if len(short_tokens) >= MAX_SHORT_TOKENS:
+                short_tokens.clear()
+            entry = short_tokens[token] = self._search(token, lo)
+        return entry
+
+    def _find_in_list(self, token, lo):
+        words = self.words
+        index = bisect.bisect_left(words, token, lo)
+        return index, words[index] if index < len(words) else None
+
+    def _search(self, token, lo):
+        index, found = self._find(token, lo)
+        if found is None:
+            return index, None
+        if found == token:
+            return index, True
+        return index, False if found.startswith(token) else None
+
+    def match(self, password):
+        """Return dictionary matches sorted by (i, j, dictionary order)
+        :param str password:
+        :rtype: list
+        """
+        matches = []
+        length = len(password)
+        password_lower = password.lower()
+        dictionaries = self.dictionaries
+        lookup = self.lookup
+        short_tokens = self._short_tokens
+
+        for i in range(length):
+            index = 0
+            for j in range(i, length):
+                word = password_lower[i:j+1]
+                entry = short_tokens.get(word) if j - i < SHORT_TOKEN_LENGTH else None
+                # longer tokens sort after their prefixes
+                index, is_word = entry if entry is not None else lookup(word, index)
+                if is_word is None:
+                    break
+                if not is_word:
+                    continue
+                for dictionary_name, ranked_dict in dictionaries:
+                    if word in ranked_dict:
+                        matches.append(DictionaryMatch(
+                            i, j, password[i:j+1], word, ranked_dict[word], dictionary_name))
+        return matches
+
+
+def sorted_words_source(ranked_dictionaries):
+    """Return the FrequencyData that all the ranked dicts were read from, if
+    it has sorted words, else None
+    :param list ranked_dictionaries: (dictionary_name, ranked_dict) pairs
+    :rtype: frequency_data.FrequencyData
+    """
+    sources = set(id(getattr(ranked_dict, "frequency_data", None)) for _, ranked_dict in ranked_dictionaries)
+    if len(sources) != 1:
+        return None
+    data = getattr(ranked_dictionaries[0][1], "frequency_data", None)
+    return data if data is not None and data.sorted_words is not None else None
+
+
+# dictionaries smaller than this (eg. user inputs) get a throwaway word list per call
+MIN_CACHED_WORD_LIST_SIZE = 1000
+MAX_CACHED_WORD_LISTS = 4
+_word_list_cache = []
+_cache_lock = threading.RLock()
+
+
+def sorted_word_list(ranked_dictionaries):
+    """Return the cached SortedWordList of the given dictionaries
+    :param list ranked_dictionaries: (dictionary_name, ranked_dict) pairs
+    :rtype: SortedWordList
+    """
+    key = [(name, id(ranked_dict), len(ranked_dict)) for name, ranked_dict in ranked_dictionaries]
+    with _cache_lock:
+        for i, (cached_key, word_list) in enumerate(_word_list_cache):
+            # the word list keeps its dicts alive, so their ids can't be reused
+            if cached_key == key:
+                if i > 0:
+                    _word_list_cache.insert(0, _word_list_cache.pop(i))
+                return word_list
+        word_list = SortedWordList(ranked_dictionaries)
+        _word_list_cache.insert(0, (key, word_list))
+        del _word_list_cache[MAX_CACHED_WORD_LISTS:]
+    return word_list
+
+
+def sorted_word_lists(_ranked_dictionaries):
+    """Return the word lists covering the given dictionaries: cached ones for
+    the bundled and for the other large dictionaries, and a throwaway one for
+    the small ones
+    :param dict _ranked_dictionaries:
+    :rtype: list
+    """
+    bundled, large, small = [], [], []
+    for name, d in _ranked_dictionaries.items():
+        data = getattr(d, "frequency_data", None)
+        if data is not None and data.sorted_words is not None:
+            bundled.append((name, d))
+        elif len(d) >= MIN_CACHED_WORD_LIST_SIZE:
+            large.append((name, d))
+        else:
+            small.append((name, d))
+    word_lists = []
+    if bundled:
+        word_lists.append(sorted_word_list(bundled))
+    if large:
+        word_lists.append(sorted_word_list(large))
+    if small:
+        word_lists.append(SortedWordList(small))
+    return word_lists
 
 
 def dictionary_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
@@ -161,45 +396,100 @@ def dictionary_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
     :param dict _ranked_dictionaries:
     :return:
     """
+    word_lists = sorted_word_lists(_ranked_dictionaries)
+    if len(word_lists) == 1:
+        return word_lists[0].match(password)
     matches = []
-    length = len(password)
+    for word_list in word_lists:
+        matches += word_list.match(password)
+    order = dict((name, k) for k, name in enumerate(_ranked_dictionaries))
+    return sorted(matches, key=lambda x: (x.i, x.j, order[x.dictionary_name]))
 
-    password_lower = password.lower()
 
-    for dictionary_name, ranked_dict in _ranked_dictionaries.items():
-        for i in range(length):
-            for j in range(length):
-                token = password_lower[i:j+1]
-                if token in ranked_dict:
-                    word = token
-                    rank = ranked_dict[word]
-                    matches.append({
-                        "pattern": "dictionary",
-                        "i": i,
-                        "j": j,
-                        "token": password[i:j+1],
-                        "matched_word": word,
-                        "rank": rank,
-                        "dictionary_name": dictionary_name,
-                        "reversed": False
-                    })
-
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+def preload(_ranked_dictionaries=RANKED_DICTIONARIES, _graphs=GRAPHS):
+    """Build the ranked dicts, the word lists of the large ones and the compiled
+    keyboard graphs now instead of on the first match, eg. before forking
+    worker processes
+    :param dict _ranked_dictionaries:
+    :param dict _graphs:
+    :return: None
+    """
+    sorted_word_lists(_ranked_dictionaries)
+    for graph in _graphs.values():
+        compiled_graph(graph)
+
+
+def select_dictionaries(names, _ranked_dictionaries=RANKED_DICTIONARIES):
+    """Match against the named dictionaries only, in the given order. The
+    others are never built, or released if they were.
+    :param list names: from FREQUENCY_LIST_NAMES and registered dictionaries
+    :param LazyRankedDictionaries _ranked_dictionaries:
+    :return: None
+    """
+    _ranked_dictionaries.select(names)
+    with _cache_lock:
+        # cached word lists keep the released dicts alive
+        del _word_list_cache[:]
+
+
+def register_dictionary(name, ordered_list, _ranked_dictionaries=RANKED_DICTIONARIES):
+    """Add a ranked word list to match against, such as a list of banned
+    passwords. Words are lowercased and ranked by their position; a callable
+    returning the list is only called on first match.
+    :param str name: dictionary_name of its matches
+    :param list ordered_list: most common first, or a callable returning it
+    :param LazyRankedDictionaries _ranked_dictionaries:
+    :return: None
+    """
+    if name == "user_inputs":
+        raise ValueError("'user_inputs' is reserved for the user inputs of each call")
+
+    def load():
+        words = ordered_list() if callable(ordered_list) else ordered_list
+        return build_ranked_dict([word.lower() for word in words])
+    _ranked_dictionaries.add_source(name, load)
+    with _cache_lock:
+        del _word_list_cache[:]
+
+
+def dictionary_memory_usage(_ranked_dictionaries=RANKED_DICTIONARIES):
+    """Return the approximate size in bytes of each built dictionary, not
+    counting the word lists shared by all of them
+    :param LazyRankedDictionaries _ranked_dictionaries:
+    :rtype: dict
+    """
+    return _ranked_dictionaries.memory_usage()
 
 
 def reverse_dictionary_match(password, _ranked_dictionaries=RANKED_DICTIONARIES):
     reversed_password = password[::-1]
     matches = dictionary_match(reversed_password, _ranked_dictionaries)
     for match in matches:
-        match["token"] = match["token"][::-1]
-        match["reversed"] = True
-        match["i"], match["j"] = (len(password) - 1 - match["j"], len(password) - 1 - match["i"])
+        match.token = match.token[::-1]
+        match.reversed = True
+        match.i, match.j = (len(password) - 1 - match.j, len(password) - 1 - match.i)
+
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+
+def with_user_input_dictionary(ordered_list, _ranked_dictionaries=RANKED_DICTIONARIES):
+    """Return a new mapping of the ranked dictionaries plus a "user_inputs"
+    dictionary, to be passed to omnimatch. Nothing global is modified, so
+    concurrent calls with different user inputs don't see each other's data.
+    :param list ordered_list:
+    :param dict _ranked_dictionaries:
+    :rtype: dict
+    """
+    ranked_dictionaries = collections.OrderedDict(
+        (name, ranked_dict) for name, ranked_dict in _ranked_dictionaries.items() if name != "user_inputs"
+    )
+    ranked_dictionaries["user_inputs"] = build_ranked_dict(ordered_list[:])
+    return ranked_dictionaries
 
 
 def set_user_input_dictionary(ordered_list):
-    """Set user-defined dictionary
+    """Set user-defined dictionary in the global RANKED_DICTIONARIES.
+    Deprecated: this is shared by every thread, use with_user_input_dictionary.
     :param list ordered_list:
     :return: None
     """
@@ -238,14 +528,11 @@ def enumerate_l33t_subs(table):
         :return:
         """
         deduped = []
-        members = {}
+        members = set()
         for sub in sub_list:
-
-            assoc = [[k, v] for k, v in sub]
-            assoc.sort()
-            label = "-".join([str(k) + "," + str(v) for k, v in assoc])
+            label = frozenset((k, v) for k, v in sub)
             if label not in members:
-                members[label] = True
+                members.add(label)
                 deduped.append(sub)
         return deduped
 
@@ -284,15 +571,124 @@ def enumerate_l33t_subs(table):
     return sub_dicts
 
 
+MAX_CACHED_L33T_SUBS = 256
+_l33t_subs_cache = collections.OrderedDict()
+
+
+def cached_l33t_subs(subtable):
+    """Memoized enumerate_l33t_subs, the returned list is shared and must not be modified
+    :param dict subtable:
+    :rtype: list
+    """
+    key = tuple((letter, tuple(subs)) for letter, subs in subtable.items())
+    with _cache_lock:
+        subs = _l33t_subs_cache.pop(key, None)
+        if subs is None:
+            subs = enumerate_l33t_subs(subtable)
+        _l33t_subs_cache[key] = subs
+        if len(_l33t_subs_cache) > MAX_CACHED_L33T_SUBS:
+            _l33t_subs_cache.popitem(last=False)
+    return subs
+
+
 def l33t_match(password, _ranked_dictionaries=RANKED_DICTIONARIES, _l33t_table=L33T_TABLE):
+    subs = cached_l33t_subs(relevant_l33t_subtable(password, _l33t_table))
+    if is_empty(subs[0]):
+        return []
+
+    password_lower = password.lower()
+    if len(password_lower) != len(password):
+        # lowercasing moved the character positions, the word list walk can't follow
+        matches = l33t_match_translated(password, subs, _ranked_dictionaries)
+        return sorted([m for m in matches if len(m.token) > 1], key=lambda x: (x.i, x.j))
+
+    # same order as matching every sub in turn and stable-sorting on (i, j):
+    # (i, j), then sub, then dictionary
+    dictionary_names = list(_ranked_dictionaries)
+    order = dict((name, index) for index, name in enumerate(dictionary_names))
+    l33t_chars = set(c for sub in subs for c in sub)
+    found = []
+    for word_list in sorted_word_lists(_ranked_dictionaries):
+        for i in range(len(password)):
+            hits = []
+            l33t_walk(password, password_lower, subs, l33t_chars, word_list,
+                      i, "", 0, {}, list(range(len(subs))), hits)
+            for j, word, sub_indices in hits:
+                token = password[i:j+1]
+                if len(token) <= 1 or token.lower() == word:
+                    continue
+                for dictionary_name, ranked_dict in word_list.dictionaries:
+                    if word in ranked_dict:
+                        for sub_index in sub_indices:
+                            found.append(((i, j, sub_index, order[dictionary_name]), word, ranked_dict[word]))
+    found.sort(key=lambda x: x[0])
+
+    matches = []
+    for (i, j, sub_index, dictionary_index), word, rank in found:
+        token = password[i:j+1]
+        match_sub = {}
+        for subbed_c, c in subs[sub_index].items():
+            if token.find(subbed_c) == -1:
+                continue
+            match_sub[subbed_c] = c
+        match = DictionaryMatch(i, j, token, word, rank, dictionary_names[dictionary_index])
+        match.l33t = True
+        match.sub = match_sub
+        match.sub_display = ", ".join(["{} -> {}".format(k, v) for k, v in match_sub.items()])
+        matches.append(match)
+    return matches
+
+
+def l33t_walk(password, password_lower, subs, l33t_chars, word_list, j, word, index, assignment, sub_indices, hits):
+    """Walk the SortedWordList along password[j:], translating each l33t character
+    by every letter that the remaining subs give it, and only as long as the
+    translated word is still a dictionary prefix.
+    index is the insertion point of word in word_list.words.
+    Appends (j, word, indices of the subs producing it) to hits for every word.
+    """
+    if j == len(password):
+        return
+    c = password[j]
+    if c not in l33t_chars:
+        branches = [(None, sub_indices)]
+    elif c in assignment:
+        branches = [(assignment[c], sub_indices)]
+    else:
+        groups = collections.OrderedDict()
+        for k in sub_indices:
+            groups.setdefault(subs[k].get(c), []).append(k)
+        branches = groups.items()
+
+    for value, indices in branches:
+        next_word = word + (value.lower() if value is not None else password_lower[j])
+        next_index, is_word = word_list.lookup(next_word, index)
+        if is_word is None:
+            continue
+        if is_word:
+            hits.append((j, next_word, indices))
+        next_assignment = assignment
+        if c in l33t_chars and c not in assignment:
+            next_assignment = dict(assignment)
+            next_assignment[c] = value
+        l33t_walk(password, password_lower, subs, l33t_chars, word_list,
+                  j + 1, next_word, next_index, next_assignment, indices, hits)
+
+
+def l33t_match_translated(password, subs, _ranked_dictionaries=RANKED_DICTIONARIES):
+    """l33t matches found by running dictionary_match on the password translated by every sub
+    :param str password:
+    :param list subs: see enumerate_l33t_subs
+    :param dict _ranked_dictionaries:
+    :rtype: list
+    """
     matches = []
-    for sub in enumerate_l33t_subs(relevant_l33t_subtable(password, _l33t_table)):
+    for sub in subs:
         if is_empty(sub):
             break
         subbed_password = translate(password, sub)
         for match in dictionary_match(subbed_password, _ranked_dictionaries):
-            token = password[match["i"]:match["j"]+1]
-            if token.lower() == match["matched_word"]:
+            token = password[match.i:match.j+1]
+            if token.lower() == match.matched_word:
                 continue
             match_sub = {}
             for subbed_c, c in sub.items():
@@ -300,79 +696,96 @@ def l33t_match(password, _ranked_dictionaries=RANKED_DICTIONARIES, _l33t_table=L
                     continue
                 match_sub[subbed_c] = c
 
-            match["l33t"] = True
-            match["token"] = token
-            match["sub"] = match_sub
-            match["sub_display"] = ", ".join(["{} -> {}".format(k, v) for k, v in match_sub.items()])
+            match.l33t = True
+            match.token = token
+            match.sub = match_sub
+            match.sub_display = ", ".join(["{} -> {}".format(k, v) for k, v in match_sub.items()])
             matches.append(match)
-    return sorted([m for m in matches if len(m["token"]) > 1], key=lambda x: (x['i'], x['j']))
+    return matches
 
 
 # #########################################################
 # spatial match (qwerty/dvorak/keypad)
 # #########################################################
 
-SHIFTED_RX = '[~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?]'
+SHIFTED_CHARS = frozenset('~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?')
+SHIFTED_GRAPHS = ["qwerty", "dvorak"]
+
+_compiled_graphs = {}
+
+
+def compile_graph(graph):
+    """Return the adjacency graph as a lookup table of prev_char + cur_char ->
+    (direction, shifted), where direction is the index of the first neighbor
+    entry of prev_char holding cur_char and shifted is True when cur_char is
+    the shifted key of that entry
+    :param dict graph:
+    :rtype: dict
+    """
+    index = {}
+    for prev_char, adjacents in graph.items():
+        for direction, adj in enumerate(adjacents):
+            if not adj:
+                continue
+            for position, cur_char in enumerate(adj):
+                index.setdefault(prev_char + cur_char, (direction, position == 1))
+    return index
+
+
+def compiled_graph(graph):
+    """Return the cached compile_graph table of an adjacency graph
+    :param dict graph:
+    :rtype: dict
+    """
+    with _cache_lock:
+        cached = _compiled_graphs.get(id(graph))
+        # the cache keeps the graph alive, so its id can't be reused
+        if cached is None or cached[0] is not graph:
+            cached = (graph, compile_graph(graph))
+            _compiled_graphs[id(graph)] = cached
+    return cached[1]
 
 
 def spatial_match(password, _graphs=GRAPHS):
     matches = []
     for graph_name, graph in _graphs.items():
         matches.extend(spatial_match_helper(password, graph, graph_name))
-    return sorted(matches, key=lambda x: (x["i"], x["j"]))
+    return sorted(matches, key=lambda x: (x.i, x.j))
 
 
 def spatial_match_helper(password, graph, graph_name):
     matches = []
+    index = compiled_graph(graph)
+    has_shift = graph_name in SHIFTED_GRAPHS
+    length = len(password)
     i = 0
-    while i < len(password) - 1:
+    while i < length - 1:
         j = i + 1
         last_direction = None
         turns = 0
 
-        if graph_name in ['qwerty', 'dvorak'] and re.findall(SHIFTED_RX, password[i]):
+        if has_shift and password[i] in SHIFTED_CHARS:
             # initial character is shifted
             shifted_count = 1
         else:
             shifted_count = 0
 
-        while True:
-            prev_char = password[j - 1]
-            found = False
-            found_direction = -1
-            cur_direction = -1
-            adjacents = graph[prev_char] if prev_char in graph else []
-            # consider growing pattern by one character if j hasn't gone over the edge
-            if j < len(password):
-                cur_char = password[j]
-                for adj in adjacents:
-                    cur_direction += 1
-                    if adj and adj.find(cur_char) != -1:
-                        found = True
-                        found_direction = cur_direction
-                        if adj.find(cur_char) == 1:
-                            shifted_count += 1
-                        if last_direction != found_direction:
-                            turns += 1
-                            last_direction = found_direction
-                        break
-
-            if found:
-                j += 1
-
-            else:
-                if (j - i) > 2:
-                    matches.append({
-                        "pattern": "spatial",
-                        "i": i,
-                        "j": j - 1,
-                        "token": password[i:j],
-                        "graph": graph_name,
-                        "turns": turns,
-                        "shifted_count": shifted_count
-                    })
-                i = j
+        # grow the pattern while each character is adjacent to the previous one
+        while j < length:
+            step = index.get(password[j - 1] + password[j])
+            if step is None:
                 break
+            direction, shifted = step
+            if shifted:
+                shifted_count += 1
+            if last_direction != direction:
+                turns += 1
+                last_direction = direction
+            j += 1
+
+        if (j - i) > 2:
+            matches.append(SpatialMatch(i, j - 1, password[i:j], graph_name, turns, shifted_count))
+        i = j
 
     return matches
 
@@ -381,118 +794,361 @@ def spatial_match_helper(password, graph, graph_name):
 # repeats (aaa, abcabcabc) and sequences (abcdef)
 # #########################################################
 
-def repeat_match(password):
-    matches = []
-    greedy = r"(.+)\1+"
-    lazy = r"(.+?)\1+"
-    lazy_anchored = r"^(.+?)\1+$"
-    lastIndex = 0
-
-    while lastIndex < len(password):
-        greedy_match = re.search(greedy, password[lastIndex:])
-        lazy_match = re.search(lazy, password[lastIndex:])
+def smallest_period(token):
+    """Return the length of the shortest x such that token is x repeated,
+    found with the prefix function of token (len(token) when there is none)
+    :param str token:
+    :rtype: int
+    """
+    prefix = [0] * len(token)
+    k = 0
+    for q in range(1, len(token)):
+        while k and token[q] != token[k]:
+            k = prefix[k - 1]
+        if token[q] == token[k]:
+            k += 1
+        prefix[q] = k
+    period = len(token) - prefix[-1] if token else 0
+    return period if period and len(token) % period == 0 else len(token)
+
+
+# segments up to this length look for squares directly
+SQUARE_SCAN_LENGTH = 16
+
+
+def z_array(chars):
+    """Return z[k] = the length of the longest common prefix of chars and
+    chars[k:], z[0] being 0
+    :param list chars:
+    :rtype: list
+    """
+    n = len(chars)
+    z = [0] * n
+    left = right = 0
+    for k in range(1, n):
+        length = min(right - k, z[k - left]) if k < right else 0
+        while k + length < n and chars[length] == chars[k + length]:
+            length += 1
+        z[k] = length
+        if k + length > right:
+            left, right = k, k + length
+    return z
+
+
+def _add_squares(segment, shift, squares):
+    """Collect the squares xx of segment as squares[|x|] -> list of
+    (first start, last start) ranges, by Main-Lorentz: the squares of each
+    half, then those crossing the middle, from the z arrays of the halves
+    :param str segment:
+    :param int shift: index of segment in the password
+    :param dict squares:
+    :return: None
+    """
+    n = len(segment)
+    if n <= SQUARE_SCAN_LENGTH:
+        for half in range(1, n // 2 + 1):
+            for i in range(n - 2 * half + 1):
+                if segment[i:i + half] == segment[i + half:i + 2 * half]:
+                    squares.setdefault(half, []).append((shift + i, shift + i))
+        return
+    nu = n // 2
+    nv = n - nu
+    u = segment[:nu]
+    v = segment[nu:]
+    _add_squares(u, shift, squares)
+    _add_squares(v, shift + nu, squares)
+
+    ru = list(reversed(u))
+    z1 = z_array(ru)
+    # None separates the halves, matching no character
+    z2 = z_array(list(v) + [None] + list(u))
+    z3 = z_array(ru + [None] + list(reversed(v)))
+    z4 = z_array(list(v))
+    for center in range(n):
+        if center < nu:
+            half = nu - center
+            k1 = z1[nu - center] if nu - center < nu else 0
+            k2 = z2[nv + 1 + center]
+        else:
+            half = center - nu + 1
+            k1 = z3[nu + nv - (center - nu)]
+            k2 = z4[center - nu + 1] if center - nu + 1 < nv else 0
+        if k1 + k2 < half:
+            continue
+        lo = max(1, half - k2)
+        hi = min(half, k1)
+        if center < nu:
+            hi = min(hi, half - 1)
+            if lo <= hi:
+                squares.setdefault(half, []).append((shift + center - hi, shift + center - lo))
+        elif lo <= hi:
+            squares.setdefault(half, []).append((shift + center - half - hi + 1, shift + center - half - lo + 1))
+
+
+def _paint(length, ranges_by_half, halves):
+    """Return index -> the first of halves whose ranges cover the index, 0
+    for none, skipping painted indices with a union-find of the next unpainted
+    :param int length:
+    :param dict ranges_by_half:
+    :param list halves:
+    :rtype: list
+    """
+    painted = [0] * length
+    next_unpainted = list(range(length + 1))
+    for half in halves:
+        for first, last in ranges_by_half[half]:
+            i = first
+            while next_unpainted[i] != i:
+                next_unpainted[i] = next_unpainted[next_unpainted[i]]
+                i = next_unpainted[i]
+            while i <= last:
+                painted[i] = half
+                next_unpainted[i] = i + 1
+                i += 1
+                while next_unpainted[i] != i:
+                    next_unpainted[i] = next_unpainted[next_unpainted[i]]
+                    i = next_unpainted[i]
+    return painted
+
+
+def square_halves(password):
+    """Return the lists of the shortest and of the longest |x| such that a
+    token xx begins at each index, 0 where none does, x being any non-empty
+    string without newlines. These are the x of (.+?)\\1+ and (.+)\\1+.
+    Takes O(n log n) time.
+    :param str password:
+    :rtype: tuple
+    """
+    squares = {}
+    shift = 0
+    for line in password.split("\n"):
+        _add_squares(line, shift, squares)
+        shift += len(line) + 1
+    halves = sorted(squares)
+    return (_paint(len(password), squares, halves),
+            _paint(len(password), squares, halves[::-1]))
+
+
+def repeat_length(password, i, base_length):
+    """Return the length of the longest run of password[i:i + base_length]
+    starting at i
+    """
+    base_token = password[i:i + base_length]
+    j = i + base_length
+    while password.startswith(base_token, j):
+        j += base_length
+    return j - i
 
-        if greedy_match is None:
-            break
 
-        if len(greedy_match.group(0)) > len(lazy_match.group(0)):
-            match = greedy_match
-            base_token = re.search(lazy_anchored, match.group(0)).group(1)
+def repeat_match(password, _ranked_dictionaries=RANKED_DICTIONARIES, _base_analyses=None):
+    """Find repeats of a base token, such as "abcabc".
+    Base tokens are analysed once per distinct token, sharing _base_analyses
+    (base token -> (guesses, matches)) with the omnimatch of each base token.
+    :param str password:
+    :param dict _ranked_dictionaries: see with_user_input_dictionary
+    :param dict _base_analyses:
+    :rtype: list
+    """
+    if _base_analyses is None:
+        _base_analyses = {}
+    matches = []
+    shortest_halves, longest_halves = square_halves(password)
 
+    i = 0
+    while i < len(password):
+        if not shortest_halves[i]:
+            i += 1
+            continue
+        shortest = shortest_halves[i]
+        longest = longest_halves[i]
+        lazy_length = repeat_length(password, i, shortest)
+        greedy_length = repeat_length(password, i, longest)
+
+        # same choice as between the greedy and the lazy regex match
+        if greedy_length > lazy_length:
+            token = password[i:i + greedy_length]
+            base_token = token[:smallest_period(token)]
         else:
-            match = lazy_match
-            base_token = match.group(1)
-
-        i, j = [match.start() + lastIndex, match.start() + len(match.group(0)) - 1 + lastIndex]
-
-        # TODO: Implement base analysis
-        base_analysis = scoring.most_guessable_match_sequence(base_token, omnimatch(base_token))
-        base_matches = base_analysis["match_sequence"] if "match_sequence" in base_analysis and base_analysis["match_sequence"] is not None else None
-        base_guesses = base_analysis["guesses"]
-        matches.append({
-            "pattern": "repeat",
-            "i": i,
-            "j": j,
-            "token": match.group(0),
-            "base_token": base_token,
-            "base_guesses": base_guesses,
-            "base_matches": base_matches,
-            "repeat_count": len(match.group(0)) / len(base_token)
-        })
-        lastIndex = j + 1
+            token = password[i:i + lazy_length]
+            base_token = token[:shortest]
+        j = i + len(token) - 1
+
+        if base_token not in _base_analyses:
+            base_analysis = scoring.most_guessable_match_sequence(
+                base_token, omnimatch(base_token, _ranked_dictionaries, _base_analyses))
+            base_matches = base_analysis["match_sequence"] if "match_sequence" in base_analysis and base_analysis["match_sequence"] is not None else None
+            _base_analyses[base_token] = (base_analysis["guesses"], base_matches)
+        base_guesses, base_matches = _base_analyses[base_token]
+        matches.append(RepeatMatch(i, j, token, base_token, base_guesses, base_matches,
+                                   len(token) / len(base_token)))
+        i = j + 1
     return matches
 
 
+def build_sequence_table(sequences):
+    """Return the table of sequence_match: every character of the sequences
+    -> a tuple of (sequence_name, position, next position, previous position,
+    sequence order, sequence length) for each sequence holding it, at its
+    first position there
+    :param dict sequences: sequence_name -> characters in order
+    :rtype: dict
+    """
+    table = {}
+    for order, (sequence_name, sequence) in enumerate(sequences.items()):
+        positions = {}
+        for position, char in enumerate(sequence):
+            positions.setdefault(char, position)
+        length = len(sequence)
+        for char, position in positions.items():
+            entry = (sequence_name, position, (position + 1) % length, (position - 1) % length, order, length)
+            table[char] = table.get(char, ()) + (entry,)
+    return table
+
+
+SEQUENCE_TABLE = build_sequence_table(SEQUENCES)
+_sequence_lock = threading.Lock()
+
+
+def register_sequence(sequence_name, sequence):
+    """Add or replace a sequence found by sequence_match, such as another
+    alphabet. All sequences are still matched in a single pass, and calls
+    scoring meanwhile see either the old or the new table.
+    :param str sequence_name:
+    :param str sequence: two or more characters in order; runs may wrap from end to start
+    :return: None
+    """
+    global SEQUENCES, SEQUENCE_TABLE
+    if len(sequence) < 2:
+        raise ValueError("a sequence needs at least two characters: {!r}".format(sequence))
+    with _sequence_lock:
+        sequences = dict(SEQUENCES)
+        sequences[sequence_name] = sequence
+        SEQUENCE_TABLE = build_sequence_table(sequences)
+        SEQUENCES = sequences
+
+
 def sequence_match(password):
+    table = SEQUENCE_TABLE  # register_sequence may replace it meanwhile
     matches = []
-    for sequence_name, sequence in SEQUENCES.items():
-        for direction in [1, -1]:
-            i = 0
-            while i < len(password):
-                if password[i] not in sequence:
-                    i += 1
-                    continue
-                j = i + 1
-                sequence_position = sequence.find(password[i])
-
-                while j < len(password):
-                    next_sequence_position = mod(sequence_position + direction, len(sequence))
-                    if sequence.find(password[j]) != next_sequence_position:
-                        break
-                    j += 1
-                    sequence_position = next_sequence_position
-                j -= 1
-                if (j - i + 1) > 1:
-                    matches.append({
-                        "pattern": "sequence",
-                        "i": i,
-                        "j": j,
-                        "token": password[i:j+1],
-                        "sequence_name": sequence_name,
-                        "sequence_space": len(sequence),
-                        "ascending": direction == 1
-                    })
-                i = j + 1
-
-    return sorted(matches, key=lambda x: (x['i'], x['j']))
+    # sequence_name -> start of the ascending run and of the descending run
+    # up to the previous character, the positions continuing each, and the
+    # order and length of the sequence
+    runs = {}
+    for k, char in enumerate(password):
+        next_runs = {}
+        for sequence_name, position, next_position, previous_position, order, length in table.get(char, ()):
+            run = runs.get(sequence_name)
+            if run is None:
+                next_runs[sequence_name] = (k, k, next_position, previous_position, order, length)
+            else:
+                next_runs[sequence_name] = (
+                    run[0] if run[2] == position else k,
+                    run[1] if run[3] == position else k,
+                    next_position, previous_position, order, length)
+        for sequence_name, run in runs.items():
+            next_run = next_runs.get(sequence_name, (k, k))
+            if k - run[0] > 1 and next_run[0] != run[0]:
+                matches.append((run[0], k - 1, run[4], True, sequence_name, run[5]))
+            if k - run[1] > 1 and next_run[1] != run[1]:
+                matches.append((run[1], k - 1, run[4], False, sequence_name, run[5]))
+        runs = next_runs
+    for sequence_name, run in runs.items():
+        if len(password) - run[0] > 1:
+            matches.append((run[0], len(password) - 1, run[4], True, sequence_name, run[5]))
+        if len(password) - run[1] > 1:
+            matches.append((run[1], len(password) - 1, run[4], False, sequence_name, run[5]))
+
+    # same order as one pass per sequence and direction
+    matches.sort(key=lambda m: (m[0], m[1], m[2], not m[3]))
+    return [
+        SequenceMatch(i, j, password[i:j+1], sequence_name, length, ascending)
+        for i, j, _, ascending, sequence_name, length in matches
+    ]
 
 
 # #########################################################
 # regex matching
 # #########################################################
 
+def regex_spans(password):
+    """Return the spans of the DEFAULT_REGEXEN matches, the same as finditer
+    gives, from a single scan over the runs of each class of characters
+    :param str password:
+    :rtype: dict
+    """
+    spans = dict((name, []) for name in DEFAULT_REGEXEN)
+    alphanumeric, alpha, digits = spans["alphanumeric"], spans["alpha"], spans["digits"]
+    single_runs = {1: spans["alpha_lower"], 2: spans["alpha_upper"], 5: spans["symbols"]}
+    # starts of the merged runs reaching up to the current run
+    alphanumeric_start = alpha_start = digits_start = None
+    last_end = None
+    for rx_match in CHAR_CLASS_RUNS_RX.finditer(password):
+        group = rx_match.lastindex
+        start, end = rx_match.span()
+        adjacent = start == last_end
+        if alphanumeric_start is not None and not (adjacent and group <= 3):
+            if last_end - alphanumeric_start >= 2:
+                alphanumeric.append((alphanumeric_start, last_end - 1))
+            alphanumeric_start = None
+        if alpha_start is not None and not (adjacent and group <= 2):
+            if last_end - alpha_start >= 2:
+                alpha.append((alpha_start, last_end - 1))
+            alpha_start = None
+        if digits_start is not None and not (adjacent and 3 <= group <= 4):
+            if last_end - digits_start >= 2:
+                digits.append((digits_start, last_end - 1))
+            digits_start = None
+
+        if group <= 3 and alphanumeric_start is None:
+            alphanumeric_start = start
+        if group <= 2 and alpha_start is None:
+            alpha_start = start
+        if 3 <= group <= 4 and digits_start is None:
+            digits_start = start
+        if group in single_runs and end - start >= 2:
+            single_runs[group].append((start, end - 1))
+        last_end = end
+
+    for merged_start, merged in [(alphanumeric_start, alphanumeric), (alpha_start, alpha), (digits_start, digits)]:
+        if merged_start is not None and last_end - merged_start >= 2:
+            merged.append((merged_start, last_end - 1))
+
+    # years are made of digits only
+    year_regex = DEFAULT_REGEXEN["recent_year"]
+    spans["recent_year"] = [
+        (rx_match.start(), rx_match.end() - 1) for start, end in spans["digits"]
+        for rx_match in year_regex.finditer(password, start, end + 1)
+    ]
+    return spans
+
+
 def regex_match(password, _regexen=REGEXEN):
     matches = []
+    scanned = None
     for name, regex in _regexen.items():
-        rx_matches = re.finditer(regex, password)
-        for rx_match in rx_matches:
-            token = rx_match.group(0)
-            matches.append({
-                "pattern": "regex",
-                "token": token,
-                "i": rx_match.start(),
-                "j": rx_match.start() + len(rx_match.group(0)) - 1,
-                "regex_name": name,
-                "regex_match": rx_match
-            })
+        if DEFAULT_REGEXEN.get(name) is regex:
+            if scanned is None:
+                scanned = regex_spans(password)
+            spans = scanned[name]
+        else:
+            spans = [(m.start(), m.end() - 1) for m in re.finditer(regex, password)]
+        for i, j in spans:
+            token = password[i:j+1]
+            year = int(token) if name == "recent_year" else None
+            matches.append(RegexMatch(i, j, token, name, year))
 
+    # highest precedence of the matches of each span, keyed by i * n + j
+    length = len(password)
     precedence_map = {}
-
-    def get_key(m):
-        return "{}-{}".format(m["i"], m["j"])
-
     for match in matches:
-        key = get_key(match)
-        precedence = REGEX_PRECEDENCE[match["regex_name"]]
-        if key in precedence_map:
-            highest_precedence = precedence_map[key]
-            if highest_precedence >= precedence:
-                continue
-        precedence_map[key] = precedence
+        key = match.i * length + match.j
+        precedence = REGEX_PRECEDENCE[match.regex_name]
+        if precedence_map.get(key, -1) < precedence:
+            precedence_map[key] = precedence
 
     return sorted(
-        [m for m in matches if precedence_map[get_key(m)] == REGEX_PRECEDENCE[m["regex_name"]]],
-        key=lambda x: (x["i"], x["j"])
+        [m for m in matches if precedence_map[m.i * length + m.j] == REGEX_PRECEDENCE[m.regex_name]],
+        key=lambda x: (x.i, x.j)
     )
 
 
@@ -500,97 +1156,80 @@ def regex_match(password, _regexen=REGEXEN):
 # date matching
 # #########################################################
 
+# maximal digit runs, which hold every date without separators
+DATE_DIGITS_RX = re.compile(r"\d+")
+# separator, 1 or 2 digits and the same separator again, between digits:
+# the middle of every date with separators, found at each position
+DATE_SEPARATORS_RX = re.compile(r"(?<=\d)(?=([\s/\\_.-])(\d{1,2})\1\d)")
+
+
 def date_match(password):
-    matches = []
-    maybe_date_no_separator = r"^\d{4,8}$"
-    maybe_date_with_separator = r"^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$"
+    digit_runs = [(m.start(), m.end()) for m in DATE_DIGITS_RX.finditer(password)]
+    starts_by_end = dict((end, start) for start, end in digit_runs)
+    ends_by_start = dict(digit_runs)
 
-    # dates without separators are between length 4 '1985' and 8 '29051985'
-    for i in range(len(password) - 3):
-        for j in range(i+3, i+8):
-            if j >= len(password):
-                break
-            token = password[i:j+1]
-            rx_match = re.match(maybe_date_no_separator, token)
-            if rx_match is None:
-                continue
-            candidates = []
-            for k, l in DATE_SPLITS[len(token)]:
+    # dates with separators are between length 6 '5/9/91' and 10 '05/29/1985'
+    separated = []
+    for rx_match in DATE_SEPARATORS_RX.finditer(password):
+        separator, middle = rx_match.groups()
+        first = rx_match.start()  # position of the first separator
+        second = first + len(middle) + 1
+        for i in range(max(first - 4, starts_by_end[first]), first):
+            for j in range(max(second + 1, i + 5), min(second + 5, ends_by_start[second + 1], i + 10)):
                 dmy = map_ints_to_dmy([
-                    int(token[0:k]),
-                    int(token[k:l]),
-                    int(token[l:])
+                    int(password[i:first]),
+                    int(middle),
+                    int(password[second+1:j+1])
                 ])
                 if dmy is not None:
-                    candidates.append(dmy)
-
-            if not len(candidates) > 0:
-                continue
-
-            def metric(candidate_date):
-                return math.fabs(candidate_date['year'] - scoring.REFERENCE_YEAR)
-
-            best_candidate = candidates[0]
-            min_distance = metric(candidates[0])
-
-            for candidate in candidates[1:]:
-                distance = metric(candidate)
-                if distance < min_distance:
-                    best_candidate = candidate
-                    min_distance = distance
-
-            matches.append({
-                "pattern": "date",
-                "token": token,
-                "i": i,
-                "j": j,
-                "separator": "",
-                "year": best_candidate["year"],
-                "month": best_candidate["month"],
-                "day": best_candidate["day"]
-            })
-
-    # dates with separators are between length 6 '5/9/91' and 10 '05/29/1985'
-    for i in range(len(password) - 5):
-        for j in range(i+5, i+10):
-            if j >= len(password):
-                break
-            token = password[i:j+1]
-            rx_match = re.match(maybe_date_with_separator, token)
-            if rx_match is None:
-                continue
-
-            dmy = map_ints_to_dmy([
-                int(rx_match.group(1)),
-                int(rx_match.group(3)),
-                int(rx_match.group(4))
-            ])
-
-            if dmy is None:
-                continue
-
-            matches.append({
-                "pattern": "date",
-                "token": token,
-                "i": i,
-                "j": j,
-                "separator": rx_match.group(2),
-                "year": dmy["year"],
-                "month": dmy["month"],
-                "day": dmy["day"],
-            })
-
-    def del_submatch(match):
-        is_submatch = False
-        for other_match in matches:
-            if match is other_match:
-                continue
-            if other_match["i"] <= match["i"] and other_match["j"] >= match["j"]:
-                is_submatch = True
-                break
-        return not is_submatch
+                    separated.append(DateMatch(
+                        i, j, password[i:j+1], separator, dmy["year"], dmy["month"], dmy["day"]))
+    separated.sort(key=lambda d: (d.i, -d.j))
+
+    # Matches inside another one are dropped. Going through the candidates in
+    # order of start, longest first, a candidate is inside another date iff
+    # it ends at or before the furthest end of the dates found so far, and
+    # then needs no parsing. A date without separators never holds one with.
+    matches = []
+    max_j = -1
+    k = 0
+    for start, end in digit_runs:
+        for i in range(start, end - 3):
+            while k < len(separated) and separated[k].i <= i:
+                if separated[k].j > max_j:
+                    matches.append(separated[k])
+                    max_j = separated[k].j
+                k += 1
+            # dates without separators are between length 4 '1985' and 8 '29051985'
+            for j in range(min(i+7, end-1), max(i+2, max_j), -1):
+                token = password[i:j+1]
+                best_candidate = None
+                min_distance = None
+                for split_k, split_l in DATE_SPLITS[len(token)]:
+                    dmy = map_ints_to_dmy([
+                        int(token[0:split_k]),
+                        int(token[split_k:split_l]),
+                        int(token[split_l:])
+                    ])
+                    if dmy is None:
+                        continue
+                    distance = math.fabs(dmy["year"] - scoring.REFERENCE_YEAR)
+                    if best_candidate is None or distance < min_distance:
+                        best_candidate = dmy
+                        min_distance = distance
+
+                if best_candidate is not None:
+                    matches.append(DateMatch(
+                        i, j, token, "", best_candidate["year"], best_candidate["month"], best_candidate["day"]))
+                    max_j = j
+                    break
+    for match in separated[k:]:
+        if match.j > max_j:
+            matches.append(match)
+            max_j = match.j
 
-    return sorted(filter(del_submatch, matches), key=lambda d: tuple(d[k] for k in sorted(d)))
+    # ordered by the fields in name order, as the dicts used to be
+    return sorted(matches, key=lambda d: (d.day, d.i, d.j, d.month, d.separator, d.token, d.year))
 
 
 def map_ints_to_dmy(int_list):
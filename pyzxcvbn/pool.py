@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Score passwords on several CPU cores.
+
+The ranked dictionaries, their sorted word lists and the keyboard graphs are
+built in the parent process before the workers are forked, so on platforms
+with fork the workers share those pages copy-on-write instead of building
+their own.
+"""
+from __future__ import absolute_import
+import gc
+import multiprocessing
+
+from . import matching
+from .main import sanitize_user_inputs, zxcvbn_many
+
+DEFAULT_CHUNKSIZE = 64
+
+
+def _picklable(match):
+    # nested matches are sent back to the parent as plain dicts too
+    match = dict(match)
+    if match.get("base_matches"):
+        match["base_matches"] = [_picklable(m) for m in match["base_matches"]]
+    return match
+
+
+def _score_chunk(args):
+    passwords, user_inputs, options = args
+    results = []
+    for result in zxcvbn_many(passwords, user_inputs, **options):
+        result["sequence"] = [_picklable(m) for m in result["sequence"]]
+        results.append(result)
+    return results
+
+
+def _chunks(passwords, user_inputs, chunksize, options):
+    chunk = []
+    for password in passwords:
+        chunk.append(password)
+        if len(chunk) == chunksize:
+            yield chunk, user_inputs, options
+            chunk = []
+    if chunk:
+        yield chunk, user_inputs, options
+
+
+class ZxcvbnPool(object):
+    """Process pool running zxcvbn.
+
+    Results are the same as zxcvbn's.
+
+        with ZxcvbnPool(workers=4) as pool:
+            results = pool.map(passwords)
+    """
+
+    def __init__(self, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        :param int workers: number of processes (default: number of CPUs)
+        :param int chunksize: passwords sent to a worker at a time
+        """
+        self.chunksize = chunksize
+        matching.preload()
+        if hasattr(multiprocessing, "get_context") and "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing
+        # keep the preloaded objects out of the workers' collector, which would
+        # otherwise write to (and un-share) their pages
+        freeze = hasattr(gc, "freeze")
+        if freeze:
+            gc.freeze()
+        try:
+            self._pool = context.Pool(workers)
+        finally:
+            if freeze:
+                gc.unfreeze()
+
+    def imap(self, passwords, user_inputs=(), chunksize=None, feedback=True, max_length=None):
+        """Score passwords, yielding results in order
+        :param iterable passwords:
+        :param list user_inputs:
+        :param int chunksize:
+        :param feedback: see zxcvbn
+        :param int max_length: see zxcvbn
+        :rtype: iterator
+        """
+        # message tables go to the workers as plain dicts, which pickle
+        options = {
+            "feedback": feedback if isinstance(feedback, bool) else dict(feedback),
+            "max_length": max_length
+        }
+        chunks = _chunks(passwords, sanitize_user_inputs(user_inputs), chunksize or self.chunksize, options)
+        for results in self._pool.imap(_score_chunk, chunks):
+            for result in results:
+                yield result
+
+    def map(self, passwords, user_inputs=(), chunksize=None, feedback=True, max_length=None):
+        """Score passwords
+        :param iterable passwords:
+        :param list user_inputs:
+        :param int chunksize:
+        :param feedback: see zxcvbn
+        :param int max_length: see zxcvbn
+        :rtype: list
+        """
+        return list(self.imap(passwords, user_inputs, chunksize, feedback, max_length))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Timings of the phases of a zxcvbn call.
+
+Pass a callback as zxcvbn(password, profile=callback) and it is called with
+the Profile of that call once the result is ready. The timers are only read
+for profiled calls, so sampling a fraction of production traffic costs the
+other calls nothing:
+
+    zxcvbn(password, profile=log_profile if random.random() < 0.01 else None)
+"""
+from __future__ import absolute_import
+import collections
+import time
+import timeit
+
+if hasattr(time, "perf_counter_ns"):
+    perf_counter_ns = time.perf_counter_ns
+else:  # Python < 3.7
+    def perf_counter_ns():
+        return int(timeit.default_timer() * 1e9)
+
+
+class Profile(object):
+    """Nanoseconds spent in each phase of one zxcvbn call, in call order, and
+    the number of matches of each pattern omnimatch found.
+    The phases are the match functions (by name), most_guessable_match_sequence,
+    estimate_attack_times and get_feedback.
+    """
+
+    def __init__(self):
+        self.timings = collections.OrderedDict()
+        self.match_counts = collections.OrderedDict()
+
+    def add(self, phase, nanoseconds):
+        self.timings[phase] = self.timings.get(phase, 0) + nanoseconds
+
+    def count_matches(self, matches):
+        for match in matches:
+            self.match_counts[match.pattern] = self.match_counts.get(match.pattern, 0) + 1
+
+    @property
+    def total(self):
+        """Nanoseconds spent in all phases"""
+        return sum(self.timings.values())
+
+    def as_dict(self):
+        """Return the profile as plain dicts, eg. for logging as JSON
+        :rtype: dict
+        """
+        return {
+            "timings": dict(self.timings),
+            "match_counts": dict(self.match_counts),
+            "total": self.total
+        }
+
+    def __repr__(self):
+        return "Profile({})".format(", ".join(
+            "{}={:.3f}ms".format(phase, nanoseconds / 1e6) for phase, nanoseconds in self.timings.items()))
@@ -2,9 +2,10 @@ from __future__ import absolute_import
 from __future__ import print_function
 import math
 import re
-from decimal import Decimal
 
 from .adjacency_graphs import adjacency_graphs
+from .combinatorics import binom, binom_sum
+from .match_types import Match, BruteforceMatch, as_match
 from six.moves import range
 
 # on qwerty, 'g' has degree 6, being adjacent to 'ftyhbv'. '\' has degree 1.
@@ -23,23 +24,7 @@ MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
 MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
 MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
 REFERENCE_YEAR = 2000
-
-
-def binom(n, k):
-    """
-    Returns binomial coefficient (n choose k).
-    """
-    # http://blog.plover.com/math/choose.html
-    if k > n:
-        return 0
-    if k == 0:
-        return 1
-    result = 1
-    for denom in range(1, k + 1):
-        result *= n
-        result /= denom
-        n -= 1
-    return result
+INFINITY = float("inf")
 
 
 def log10(n):
@@ -77,20 +62,57 @@ def insert_val_to_arr(array, index, value, default=None):
             array[index] = value
 
 
-def most_guessable_match_sequence(password, matches, _exclude_additive=False):
-    optimal_product = [[] for _ in range(len(password)+1)]
-    backpointers = [[] for _ in range(len(password)+1)]
+def most_guessable_match_sequence(password, matches, _exclude_additive=False, _search=None):
+    """Return the sequence of non-overlapping matches covering password that
+    takes the fewest guesses, filling the gaps with bruteforce matches.
+    :param str password:
+    :param list matches: match_types.Match objects, or dicts converted to them
+    :param bool _exclude_additive: leave out the additive sequence length penalty (for tests)
+    :param dict _search: DP columns of an earlier call, updated in place. Its
+        first _search["valid"] columns are kept, which is only correct when the
+        matches ending there and password up to there are the same as before.
+    :rtype: dict
+    """
+    for result in most_guessable_match_sequence_steps(password, matches, _exclude_additive, _search):
+        pass
+    return result
 
-    max_l = 0
-    optimal_l = None
 
-    def make_bruteforce_match(i, j):
-        return {
-            "pattern": "bruteforce",
-            "token": password[i:j+1],
-            "i": i,
-            "j": j
-        }
+def most_guessable_match_sequence_steps(password, matches, _exclude_additive=False, _search=None):
+    """Same as most_guessable_match_sequence, as a generator yielding None
+    after each column of the search and the result last, so that the caller
+    can do other work in between
+    :rtype: generator
+    """
+    n = len(password)
+    # the last column decides the result, so it is always recomputed
+    start = min(_search.get("valid", 0), n - 1) if _search is not None and n else 0
+
+    # matches grouped by the position they end at, keeping their order
+    matches_by_j = [[] for _ in range(n)]
+    for match in matches:
+        match = as_match(match)
+        if start <= match.j < n:
+            matches_by_j[match.j].append(match)
+
+    # optimal_product[k][l]: guess product of the best length-l sequence over password[0..k]
+    # backpointers[k][l]: the last match of that sequence
+    # max_ls[k]: the longest sequence length seen up to k
+    if start:
+        optimal_product = _search["optimal_product"][:start] + [{} for _ in range(start, n)]
+        backpointers = _search["backpointers"][:start] + [{} for _ in range(start, n)]
+        max_ls = _search["max_ls"][:start] + [0] * (n - start)
+        max_l = max_ls[start - 1]
+    else:
+        optimal_product = [{} for _ in range(n)]
+        backpointers = [{} for _ in range(n)]
+        max_ls = [0] * n
+        max_l = 0
+    if _search is not None:
+        _search.update(optimal_product=optimal_product, backpointers=backpointers, max_ls=max_ls, valid=n)
+
+    optimal_l = None
+    optimal_score = 1  # an empty password takes a single guess
 
     def score(guess_product, sequence_length):
         result = math.factorial(sequence_length) * guess_product
@@ -98,10 +120,12 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
             result += math.pow(MIN_GUESSES_BEFORE_GROWING_SEQUENCE, sequence_length - 1)
         return result
 
-    for k in range(len(password)):
-        backpointers[k] = []
-        optimal_product[k] = []
-        optimal_score = Decimal("Infinity")
+    for k in range(start, n):
+        product_k = optimal_product[k]
+        backpointers_k = backpointers[k]
+        backpointers_prev = backpointers[k-1] if k > 0 else {}
+        matches_k = matches_by_j[k]
+        optimal_score = INFINITY
 
         for prev_l in range(max_l + 1):
             # for each new k, starting scenario to try to beat: bruteforce matches
@@ -116,92 +140,78 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
             # otherwise: there is no bruteforce starting scenario that might be better
             # than already-discovered lower-l sequences.
             consider_bruteforce = True
-            bf_j = k
-            try:
-                if prev_l == 0:
-                    bf_i = 0
-                    new_l = 1
-                elif "pattern" in backpointers[k-1][prev_l] and \
-                        backpointers[k-1][prev_l]["pattern"] == "bruteforce":
-                    bf_i = backpointers[k-1][prev_l]["i"]
+            if prev_l == 0:
+                bf_i = 0
+                new_l = 1
+            else:
+                prev_match = backpointers_prev.get(prev_l)
+                if prev_match is None:
+                    consider_bruteforce = False
+                elif prev_match.pattern == "bruteforce":
+                    bf_i = prev_match.i
                     new_l = prev_l
-                elif backpointers[k-1][prev_l] is not None:
+                else:
                     bf_i = k
                     new_l = prev_l + 1
-                else:
-                    # bf_i = 0
-                    # new_l = None
-                    consider_bruteforce = False
-            except:
-                # bf_i = 0
-                # new_l = None
-                consider_bruteforce = False
 
             if consider_bruteforce:
-                bf_match = make_bruteforce_match(bf_i, bf_j)
-                prev_j = k - len(bf_match["token"])  # end of preceeding match
+                bf_match = BruteforceMatch(bf_i, k, password[bf_i:k+1])
                 candidate_product = estimate_guesses(bf_match, password)
                 if new_l > 1:
-                    candidate_product *= optimal_product[prev_j][new_l - 1]
+                    # end of preceeding match is bf_i - 1
+                    candidate_product *= optimal_product[bf_i - 1][new_l - 1]
                 candidate_score = score(candidate_product, new_l)
 
                 if candidate_score < optimal_score:
                     optimal_score = candidate_score
-                    # optimal_product[k][new_l] = candidate_product
-                    insert_val_to_arr(optimal_product[k], new_l, candidate_product)
+                    product_k[new_l] = candidate_product
                     optimal_l = new_l
                     max_l = max(max_l, new_l)
-                    # backpointers[k][new_l] = bf_match
-                    insert_val_to_arr(backpointers[k], new_l, bf_match)
+                    backpointers_k[new_l] = bf_match
 
             # now try beating those bruteforce starting scenarios.
             # for each match m ending at k, see if forming a (prev_l + 1) sequence
             # ending at m is better than the current optimum.
-            for match in matches:
-                if match["j"] != k:
-                    continue
-                i, j = (match["i"], match["j"])
+            for match in matches_k:
+                i = match.i
 
                 if prev_l == 0:
                     # if forming a len-1 sequence [match], match.i must fully cover [0..k]
                     if i != 0:
                         continue
+                    candidate_product = estimate_guesses(match, password)
                 else:
                     # it's only possible to form a new potentially-optimal sequence ending at
                     # match when there's an optimal length-prev_l sequence ending at match.i-1.
-                    try:
-                        if not optimal_product[i-1][prev_l]:
-                            continue
-                    except:
+                    prev_product = optimal_product[i-1].get(prev_l) if i > 0 else None
+                    if not prev_product:
                         continue
+                    candidate_product = estimate_guesses(match, password) * prev_product
 
-                candidate_product = estimate_guesses(match, password)
-                if prev_l > 0:
-                    candidate_product *= optimal_product[i-1][prev_l]
                 candidate_score = score(candidate_product, prev_l + 1)
                 if candidate_score < optimal_score:
                     optimal_score = candidate_score
-                    insert_val_to_arr(optimal_product[k], prev_l + 1, candidate_product)
-                    # optimal_product[k][prev_l+1] = candidate_product
+                    product_k[prev_l + 1] = candidate_product
                     optimal_l = prev_l + 1
-                    max_l = max(max_l, prev_l+1)
-                    insert_val_to_arr(backpointers[k], prev_l + 1, match)
-                    # backpointers[k][prev_l+1] = match
+                    max_l = max(max_l, prev_l + 1)
+                    backpointers_k[prev_l + 1] = match
+        max_ls[k] = max_l
+        yield None
 
     # walk backwards and decode the optimal sequence
     match_sequence = []
     l = optimal_l
-    k = len(password) - 1
+    k = n - 1
 
     while k >= 0:
         match = backpointers[k][l]
         match_sequence.append(match)
-        k = match["i"] - 1
+        k = match.i - 1
         l -= 1
     match_sequence.reverse()
 
     # final result object
-    return {
+    yield {
         "password": password,
         "guesses": optimal_score,
         "guesses_log10": log10(optimal_score),
@@ -209,41 +219,82 @@ def most_guessable_match_sequence(password, matches, _exclude_additive=False):
     }
 
 
+def with_bruteforce_remainder(result, password):
+    """Extend the result of most_guessable_match_sequence for a prefix of
+    password to the whole of it, as if the rest were one more bruteforce
+    match. Its guesses multiply those of the prefix; they are infinite past
+    the float range, where guesses_log10 stays finite.
+    :param dict result: search result of password[:k]
+    :param str password:
+    :rtype: dict
+    """
+    i = len(result["password"])
+    if i >= len(password):
+        return result
+    match = BruteforceMatch(i, len(password) - 1, password[i:])
+    try:
+        match.guesses = bruteforce_guesses(match)
+        match.guesses_log10 = log10(match.guesses)
+    except OverflowError:
+        match.guesses = INFINITY
+        match.guesses_log10 = len(match.token) * log10(BRUTEFORCE_CARDINALITY)
+    result["password"] = password
+    result["guesses"] = result["guesses"] * match.guesses
+    result["guesses_log10"] += match.guesses_log10
+    result["sequence"].append(match)
+    return result
+
+
 # ------------------------------------------------------------------------------
 # guess estimation -- one function per match pattern ---------------------------
 # ------------------------------------------------------------------------------
 def estimate_guesses(match, password):
-    if "guesses" in match and match["guesses"]:
-        return match["guesses"]  # a match's guess estimate doesn't change. cache it.
+    return estimate_guesses_for_length(match, len(password))
+
+
+def estimate_guesses_for_length(match, password_length):
+    """Same as estimate_guesses, which only depends on the length of the
+    password the match was found in
+    :param match: match_types.Match object or dict
+    :param int password_length:
+    :rtype: float
+    """
+    if isinstance(match, Match):
+        if match.guesses:
+            return match.guesses  # a match's guess estimate doesn't change. cache it.
+        token_length = len(match.token)
+        pattern = match.pattern
+    else:
+        if "guesses" in match and match["guesses"]:
+            return match["guesses"]
+        token_length = len(match["token"])
+        pattern = match["pattern"]
     min_guesses = 1
-    if len(match["token"]) < len(password):
-        if len(match["token"]) == 1:
+    if token_length < password_length:
+        if token_length == 1:
             min_guesses = MIN_SUBMATCH_GUESSES_SINGLE_CHAR
         else:
             min_guesses = MIN_SUBMATCH_GUESSES_MULTI_CHAR
 
-    estimation_functions = {
-        "bruteforce": bruteforce_guesses,
-        "dictionary": dictionary_guesses,
-        "spatial":    spatial_guesses,
-        "repeat":     repeat_guesses,
-        "sequence":   sequence_guesses,
-        "regex":      regex_guesses,
-        "date":       date_guesses
-    }
-    guesses = estimation_functions[match["pattern"]](match)
+    guesses = ESTIMATION_FUNCTIONS[pattern](match)
     if not isinstance(guesses, (int, float)):
         print("hoge")
-    match["guesses"] = max(guesses, min_guesses)
-    match["guesses_log10"] = log10(match["guesses"])
-    return match["guesses"]
+    guesses = max(guesses, min_guesses)
+    if isinstance(match, Match):
+        match.guesses = guesses
+        match.guesses_log10 = log10(guesses)
+    else:
+        match["guesses"] = guesses
+        match["guesses_log10"] = log10(guesses)
+    return guesses
 
 
 def bruteforce_guesses(match):
-    guesses = math.pow(BRUTEFORCE_CARDINALITY, len(match["token"]))
+    token_length = len(match["token"])
+    guesses = math.pow(BRUTEFORCE_CARDINALITY, token_length)
     # small detail: make bruteforce matches at minimum one guess bigger than smallest allowed
     # submatch guesses, such that non-bruteforce submatches over the same [i..j] take precidence.
-    if len(match["token"]) == 1:
+    if token_length == 1:
         min_guesses = MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1
     else:
         min_guesses = MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1
@@ -291,7 +342,7 @@ def regex_guesses(match):
     elif "regex_name" in match and match["regex_name"] == "recent_year":
         # conservative estimate of year space: num years from REFERENCE_YEAR.
         # if year is close to REFERENCE_YEAR, estimate a year space of MIN_YEAR_SPACE.
-        year_space = math.fabs(int(match["regex_match"].group(0))) - REFERENCE_YEAR
+        year_space = math.fabs(match["year"]) - REFERENCE_YEAR
         year_space = max(year_space, MIN_YEAR_SPACE)
         return year_space
 
@@ -318,34 +369,70 @@ KEYBOARD_STARTING_POSITIONS = len([k for k, v in adjacency_graphs["qwerty"].item
 KEYPAD_STARTING_POSITIONS = len([k for k, v in adjacency_graphs["keypad"].items()])
 
 
-def spatial_guesses(match):
-    if "graph" in match and match["graph"] in ['qwerty', 'dvorak']:
+# spatial_guesses factors are memoized for tokens up to this many characters
+SPATIAL_TABLE_MAX_LENGTH = 100
+# (keyboard, length, turns) -> guesses of the turn patterns
+_spatial_patterns_table = {}
+# (shifted, unshifted) -> variations of the shifted keys
+_shifted_variations_table = {}
+
+
+def spatial_patterns(keyboard, L, t):
+    """Estimate the number of possible patterns w/ length L or less with t turns or less
+    :param bool keyboard: on a keyboard, else a keypad
+    :param int L:
+    :param int t:
+    :rtype: float
+    """
+    if keyboard:
         s = KEYBOARD_STARTING_POSITIONS
         d = KEYBOARD_AVERAGE_DEGREE
     else:
         s = KEYPAD_STARTING_POSITIONS
         d = KEYPAD_AVERAGE_DEGREE
     guesses = 0
-    L = len(match["token"])
-    t = match["turns"]
-    # estimate the number of possible patterns w/ length L or less with t turns or less.
     for i in range(2, L + 1):
         possible_turns = min(t, i - 1)
         for j in range(1, possible_turns + 1):
             guesses += binom(i - 1, j - 1) * s * math.pow(d, j)
+    return guesses
+
+
+def shifted_variations(S, U):
+    """Return the number of ways to shift S of S + U keys or less
+    :param int S: shifted count
+    :param int U: unshifted count
+    :rtype: int
+    """
+    return binom_sum(S + U, min(S, U))
+
+
+def spatial_guesses(match):
+    keyboard = "graph" in match and match["graph"] in ['qwerty', 'dvorak']
+    L = len(match["token"])
+    # no pattern of length L has more than L - 1 turns to count
+    t = min(match["turns"], L - 1)
+    key = (keyboard, L, t)
+    guesses = _spatial_patterns_table.get(key)
+    if guesses is None:
+        guesses = spatial_patterns(keyboard, L, t)
+        if L <= SPATIAL_TABLE_MAX_LENGTH:
+            _spatial_patterns_table[key] = guesses
 
     # add extra guesses for shifted keys. (% instead of 5, A instead of a.)
     # math is similar to extra guesses of l33t substitutions in dictionary matches.
     if "shifted_count" in match and match["shifted_count"]:
         S = match["shifted_count"]
-        U = len(match["token"]) - match["shifted_count"]  # unshifted count
+        U = L - S  # unshifted count
         if S == 0 or U == 0:
             guesses *= 2
         else:
-            shifted_variations = 0
-            for i in range(1, min(S, U) + 1):
-                shifted_variations += binom(S + U, i)
-            guesses *= shifted_variations
+            variations = _shifted_variations_table.get((S, U))
+            if variations is None:
+                variations = shifted_variations(S, U)
+                if L <= SPATIAL_TABLE_MAX_LENGTH:
+                    _shifted_variations_table[(S, U)] = variations
+            guesses *= variations
     return guesses
 
 
@@ -357,35 +444,41 @@ def dictionary_guesses(match):
     return match["base_guesses"] * match["uppercase_variations"] * match["l33t_variations"] * reversed_variations
 
 
-START_UPPER = r"^[A-Z][^A-Z]+$"
-END_UPPER = r"^[^A-Z]+[A-Z]$"
-ALL_UPPER = r"^[^a-z]+$"
-ALL_LOWER = r"^[^A-Z]+$"
-NO_LETTER = r"^$"
+START_UPPER = re.compile(r"^[A-Z][^A-Z]+$")
+ALL_UPPER = re.compile(r"^[^a-z]+$")
+
+
+ASCII_UPPER = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+ASCII_LOWER = frozenset("abcdefghijklmnopqrstuvwxyz")
 
 
 def uppercase_variations(match):
     word = match["token"]
-    if re.search(ALL_LOWER, word) or re.search(NO_LETTER, word):
+    U = 0
+    L = 0
+    upper_index = None
+    for k, c in enumerate(word):
+        if c in ASCII_UPPER:
+            U += 1
+            upper_index = k
+        elif c in ASCII_LOWER:
+            L += 1
+    if U == 0:
         return 1
 
     # a capitalized word is the most common capitalization scheme,
     # so it only doubles the search space (uncapitalized + capitalized).
     # allcaps and end-capitalized are common enough too, underestimate as 2x factor to be safe.
-    for regex in [START_UPPER, END_UPPER, ALL_UPPER]:
-        if re.search(regex, word):
-            return 2
+    # (an uppercase letter before a final newline counts as the last one, as
+    # the $ of the ^[^A-Z]+[A-Z]$ pattern used to match it)
+    if L == 0 or U == 1 and (upper_index == 0 or upper_index == len(word) - 1 or
+                             upper_index == len(word) - 2 and word[-1] == "\n"):
+        return 2
 
     # otherwise calculate the number of ways to capitalize U+L uppercase+lowercase letters
     # with U uppercase letters or less. or, if there's more uppercase than lower (for eg. PASSwORD),
     # the number of ways to lowercase U+L letters with L lowercase letters or less.
-    U = len([c for c in word if re.match(u"[A-Z]", c)])
-    L = len([c for c in word if re.match(u"[a-z]", c)])
-
-    variations = 0
-    for i in range(1, min(U, L) + 1):
-        variations += binom(U + L, i)
-    return variations
+    return binom_sum(U + L, min(U, L))
 
 
 def l33t_variations(match):
@@ -393,11 +486,14 @@ def l33t_variations(match):
         return 1
     variations = 1
 
+    # lower-case match.token before counting: capitalization shouldn't affect l33t calc.
+    counts = {}
+    for c in match["token"].lower():
+        counts[c] = counts.get(c, 0) + 1
+
     for subbed, unsubbed in match["sub"].items():
-        # lower-case match.token before calculating: capitalization shouldn't affect l33t calc.
-        c_list = match["token"].lower()
-        num_subbed = len([c for c in c_list if c == subbed])
-        num_unsubbed = len([c for c in c_list if c == unsubbed])
+        num_subbed = counts.get(subbed, 0)
+        num_unsubbed = counts.get(unsubbed, 0)
 
         if num_subbed == 0 or num_unsubbed == 0:
             # for this sub, password is either fully subbed (444) or fully unsubbed (aaa)
@@ -408,10 +504,18 @@ def l33t_variations(match):
         else:
             # this case is similar to capitalization:
             # with aa44a, U = 3, S = 2, attacker needs to try unsubbed + one sub + two subs
-            p = min(num_unsubbed, num_subbed)
-            possibilities = 0
-            for i in range(1, p+1):
-                possibilities += binom(num_unsubbed + num_subbed, i)
-            variations *= possibilities
+            variations *= binom_sum(num_unsubbed + num_subbed, min(num_unsubbed, num_subbed))
 
     return variations
+
+
+# built once, looked up by estimate_guesses for every match
+ESTIMATION_FUNCTIONS = {
+    "bruteforce": bruteforce_guesses,
+    "dictionary": dictionary_guesses,
+    "spatial":    spatial_guesses,
+    "repeat":     repeat_guesses,
+    "sequence":   sequence_guesses,
+    "regex":      regex_guesses,
+    "date":       date_guesses
+}
@@ -38,6 +38,10 @@ def guesses_to_score(guesses):
         return 4
 
 
+# guesses_to_score as thresholds: the score is the number of them at or below the guesses
+SCORE_THRESHOLDS = [1e3 + 5, 1e6 + 5, 1e8 + 5, 1e10 + 5]
+
+
 def display_time(seconds):
     minute = 60
     hour = minute * 60
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Compile pyzxcvbn/frequency_lists.py into the binary pyzxcvbn/frequency_lists.bin
+
+usage: python scripts/build_frequency_data.py [output_path]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyzxcvbn import frequency_data  # noqa: E402
+from pyzxcvbn.frequency_lists import frequency_lists  # noqa: E402
+from pyzxcvbn.matching import FREQUENCY_LIST_NAMES  # noqa: E402
+
+
+def main(argv):
+    path = argv[1] if len(argv) > 1 else frequency_data.DEFAULT_PATH
+    lists = dict((name, frequency_lists[name]) for name in FREQUENCY_LIST_NAMES)
+    frequency_data.write_frequency_data(path, lists, FREQUENCY_LIST_NAMES)
+    print("wrote {} ({} bytes)".format(path, os.path.getsize(path)))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -9,6 +9,7 @@ sys.path.append('./tests.py')
 setup(
     name=pyzxcvbn.__title__,
     packages=find_packages(),
+    package_data={"pyzxcvbn": ["frequency_lists.bin"]},
     version=pyzxcvbn.__version__,
     author=pyzxcvbn.__author__,
     author_email=pyzxcvbn.__author_email__,
@@ -37,4 +38,7 @@ Install
     install_requires=[
         'six',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
 )
@@ -1,13 +1,25 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 import math
+import os
+import pickle
+import re
+import shutil
 import six
+import tempfile
+import threading
 import unittest
 
 from pyzxcvbn import scoring
+from pyzxcvbn import zxcvbn, zxcvbn_many, BatchStats
 from pyzxcvbn.scoring import binom
 
+from pyzxcvbn import bulk
+from pyzxcvbn import combinatorics
 from pyzxcvbn import matching
+from pyzxcvbn import match_types
+from pyzxcvbn import time_estimates
+from pyzxcvbn import frequency_data
 from pyzxcvbn.matching import is_empty
 from pyzxcvbn.adjacency_graphs import adjacency_graphs
 
@@ -55,6 +67,11 @@ class TestScoringFunctions(unittest.TestCase):
         self.assertEqual(m0["token"], password, msg1("match['token'] == '{}'".format(password)))
         self.assertEqual([m0["i"], m0["j"]], [0, 9], msg1("[i, j] == [{}, {}]".format(m0["i"], m0["j"])))
 
+        # Case
+        result = scoring.most_guessable_match_sequence("", [])
+        msg = "returns an empty sequence of one guess for an empty password"
+        self.assertEqual([result["sequence"], result["guesses"]], [[], 1], msg)
+
         # Case
         def msg2(s):
             return "returns match + bruteforce when match covers a prefix of password: {}".format(s)
@@ -270,6 +287,48 @@ class TestScoringFunctions(unittest.TestCase):
         msg = "spatial guesses accounts for turn positions, directions and starting keys"
         self.assertEqual(scoring.spatial_guesses(match), guesses, msg)
 
+        # Case
+        def original_binom(n, k):
+            if k > n:
+                return 0
+            result = 1
+            for denom in range(1, k + 1):
+                result *= n
+                result /= denom
+                n -= 1
+            return result
+
+        def original_spatial_guesses(match):
+            keyboard = match["graph"] in ["qwerty", "dvorak"]
+            s = scoring.KEYBOARD_STARTING_POSITIONS if keyboard else scoring.KEYPAD_STARTING_POSITIONS
+            d = scoring.KEYBOARD_AVERAGE_DEGREE if keyboard else scoring.KEYPAD_AVERAGE_DEGREE
+            guesses = 0
+            L = len(match["token"])
+            for i in range(2, L + 1):
+                for j in range(1, min(match["turns"], i - 1) + 1):
+                    guesses += original_binom(i - 1, j - 1) * s * math.pow(d, j)
+            S = match["shifted_count"]
+            U = L - S
+            if S and not U:
+                guesses *= 2
+            elif S:
+                guesses *= sum(original_binom(S + U, i) for i in range(1, min(S, U) + 1))
+            return guesses
+
+        # the original float binom rounds its running products, the exact
+        # one does not, so results may differ in the last few ulps
+        msg = "memoized guesses match the original loops to a relative 1e-13, before and after memoization"
+        for graph in ["qwerty", "keypad"]:
+            for L in list(range(2, 62, 5)) + [scoring.SPATIAL_TABLE_MAX_LENGTH + 20]:
+                for turns in [1, 2, 3, 8, 21, 40]:
+                    for shifted_count in sorted(set([0, 1, L // 3, L])):
+                        match = {"token": "q" * L, "graph": graph, "turns": turns, "shifted_count": shifted_count}
+                        expected = original_spatial_guesses(match)
+                        for _ in range(2):
+                            self.assertAlmostEqual(scoring.spatial_guesses(match) / expected, 1, delta=1e-13,
+                                                   msg="{} for {}".format(msg, match))
+        self.assertNotIn((True, scoring.SPATIAL_TABLE_MAX_LENGTH + 20, 40), scoring._spatial_patterns_table, msg)
+
     def test_dictionary_guesses(self):
 
         # Case
@@ -318,6 +377,19 @@ class TestScoringFunctions(unittest.TestCase):
         expected = 32 * scoring.l33t_variations(match) * scoring.uppercase_variations(match)
         self.assertEqual(scoring.dictionary_guesses(match), expected, msg)
 
+    def test_binom(self):
+
+        # Case
+        msg = "binomial coefficients are exact integers"
+        self.assertEqual([binom(5, k) for k in range(-1, 7)], [0, 1, 5, 10, 10, 5, 1, 0], msg)
+        self.assertEqual(binom(60, 30), 118264581564861424, msg)
+        self.assertEqual(binom(300, 150), math.factorial(300) // math.factorial(150) ** 2, msg)
+
+        # Case
+        msg = "binom_sum adds C(n, 1) up to C(n, k)"
+        for n, k in [(6, 2), (10, 10), (10, 12), (40, 17), (250, 3), (5, 0)]:
+            self.assertEqual(combinatorics.binom_sum(n, k), sum(binom(n, i) for i in range(1, k + 1)), msg)
+
     def test_uppercase_variations(self):
 
         # Case
@@ -533,8 +605,8 @@ class TestMatchingFunctions(unittest.TestCase):
         })
 
         # Case
-        matching.set_user_input_dictionary(["foo", "bar"])
-        matches = matching.dictionary_match("foobar")
+        ranked_dictionaries = matching.with_user_input_dictionary(["foo", "bar"])
+        matches = matching.dictionary_match("foobar", ranked_dictionaries)
         matches = filter(lambda m: m["dictionary_name"] == "user_inputs", matches)
         msg = "matches with provided user input dictionary"
         self.check_matches(msg, matches, "dictionary", ["foo", "bar"], [[0, 2], [3, 5]], {
@@ -542,6 +614,83 @@ class TestMatchingFunctions(unittest.TestCase):
             "rank": [1, 2]
         })
 
+        # Case
+        msg = "doesn't add user inputs to the global dictionaries"
+        self.assertNotIn("user_inputs", matching.RANKED_DICTIONARIES, msg)
+
+    def test_sorted_word_list(self):
+        def naive_dictionary_match(password, ranked_dictionaries):
+            matches = []
+            password_lower = password.lower()
+            for name, ranked_dict in ranked_dictionaries.items():
+                for i in range(len(password)):
+                    for j in range(i, len(password)):
+                        word = password_lower[i:j+1]
+                        if word in ranked_dict:
+                            matches.append([i, j, word, ranked_dict[word], name])
+            return sorted(matches, key=lambda m: (m[0], m[1]))
+
+        # Case
+        dictionaries = dict((name, matching.RANKED_DICTIONARIES[name]) for name in matching.FREQUENCY_LIST_NAMES)
+        dictionaries["user_inputs"] = matching.build_ranked_dict(["horsebat", "rry", "x"])
+        surnames = {"surnames": dictionaries["surnames"], "user_inputs": dictionaries["user_inputs"]}
+        for password in ["correcthorsebatterystaple", "Tr0ub4dour&3", "qwertyuiopasdfx", "zZz"]:
+            for ranked_dictionaries in [dictionaries, surnames]:
+                matches = matching.dictionary_match(password, ranked_dictionaries)
+                msg = "finds the same matches as probing every substring: {}".format(password)
+                self.assertEqual(
+                    [[m["i"], m["j"], m["matched_word"], m["rank"], m["dictionary_name"]] for m in matches],
+                    naive_dictionary_match(password, ranked_dictionaries), msg)
+
+        # Case
+        bundled = [(name, dictionaries[name]) for name in matching.FREQUENCY_LIST_NAMES]
+        word_list = matching.SortedWordList(bundled)
+        msg = "searches the sorted words of the bundled data file"
+        self.assertIs(word_list.words, frequency_data.default_frequency_data().sorted_words, msg)
+        sorted_list = matching.SortedWordList(
+            [(name, dict(ranked_dict)) for name, ranked_dict in bundled] + [("d", {"password": 1})])
+        msg = "finds the same as a list of the words sorted on creation"
+        self.assertIsInstance(sorted_list.words, list, msg)
+        for token in ["", "a", "aa", "pass", "password", "passwordz", "zzzz", "zzzzzzzzzz", "~", u"\xe9t\xe9", "0"]:
+            self.assertEqual(word_list.lookup(token)[1], sorted_list.lookup(token)[1], msg)
+        for k in range(0, len(sorted_list.words), 997):
+            word = sorted_list.words[k]
+            self.assertEqual(word_list.lookup(word, k - 40 if k > 40 else 0), (k, True), msg)
+        self.assertEqual(word_list.max_length, max(len(word) for _, d in bundled for word in d), msg)
+
+        # Case
+        word_list = matching.SortedWordList([("d", matching.build_ranked_dict(["abc", "abd", "b"]))])
+        msg = "tells words, prefixes of words and other tokens apart"
+        self.assertEqual([word_list.lookup(token)[1] for token in ["ab", "abc", "abcd", "b", "c", "abz"]],
+                         [False, True, None, True, None, None], msg)
+        msg = "remembers at most MAX_SHORT_TOKENS short tokens"
+        for k in range(matching.MAX_SHORT_TOKENS + 10):
+            word_list.lookup(six.unichr(256 + k))
+        self.assertLessEqual(len(word_list._short_tokens), matching.MAX_SHORT_TOKENS, msg)
+
+    def test_register_dictionary(self):
+        ranked_dictionaries = frequency_data.LazyRankedDictionaries(
+            [(name, matching.frequency_list_loader(name)) for name in matching.FREQUENCY_LIST_NAMES])
+
+        # Case
+        matching.select_dictionaries(["passwords", "english"], ranked_dictionaries)
+        matching.dictionary_match("password", ranked_dictionaries)
+        msg = "builds only the selected dictionaries"
+        self.assertEqual(sorted(matching.dictionary_memory_usage(ranked_dictionaries)), ["english", "passwords"], msg)
+
+        # Case
+        matching.register_dictionary("banned", lambda: ["Acme", "acmecorp"], ranked_dictionaries)
+        msg = "doesn't build registered dictionaries before use"
+        self.assertFalse(ranked_dictionaries.is_loaded("banned"), msg)
+        matches = [m for m in matching.dictionary_match("acmecorp", ranked_dictionaries)
+                   if m["dictionary_name"] == "banned"]
+        msg = "matches registered dictionaries, lowercased and ranked by position"
+        self.check_matches(msg, matches, "dictionary", ["acme", "acmecorp"], [[0, 3], [0, 7]], {
+            "matched_word": ["acme", "acmecorp"],
+            "rank": [1, 2]
+        })
+        self.assertRaises(ValueError, matching.register_dictionary, "user_inputs", [], ranked_dictionaries)
+
     def test_reversed_dictionary_match(self):
 
         # Case
@@ -648,8 +797,29 @@ class TestMatchingFunctions(unittest.TestCase):
         matches = matching.l33t_match("4 1 @")
         self.assertEqual(matches, [], msg)
 
+        # Case
+        for password in ["4@8(<{[3691!|70$5+7%2", "P4$$w0rd!1|", "7!ger|ily", "h4ck3r1337"]:
+            subs = matching.enumerate_l33t_subs(matching.relevant_l33t_subtable(password, matching.L33T_TABLE))
+            msg = "memoizes the enumerated subs: {}".format(password)
+            self.assertEqual(matching.cached_l33t_subs(matching.relevant_l33t_subtable(password, matching.L33T_TABLE)), subs, msg)
+
+            expected = sorted([m for m in matching.l33t_match_translated(password, subs) if len(m["token"]) > 1],
+                              key=lambda m: (m["i"], m["j"]))
+            matches = matching.l33t_match(password)
+            msg = "finds the same matches as translating the password by every sub: {}".format(password)
+            self.assertEqual(matches, expected, msg)
+            self.assertEqual([m["sub_display"] for m in matches], [m["sub_display"] for m in expected], msg)
+
     def test_spatial_match(self):
 
+        # Case
+        index = matching.compile_graph(adjacency_graphs["qwerty"])
+        msg = "compiles adjacency graphs into (direction, shifted) per pair of keys"
+        self.assertEqual(index["qw"], (3, False), msg)
+        self.assertEqual(index["qW"], (3, True), msg)
+        self.assertEqual(index["w@"], (1, True), msg)
+        self.assertNotIn("qp", index, msg)
+
         # Case
         for password in ["", "/", "qw", "*/"]:
             msg = "doesn't match 1- and 2-character spatial patterns"
@@ -757,6 +927,29 @@ class TestMatchingFunctions(unittest.TestCase):
                 "ascending": [is_ascending]
             })
 
+    def test_register_sequence(self):
+        sequences, table = matching.SEQUENCES, matching.SEQUENCE_TABLE
+        matching.register_sequence("greek", u"\u03b1\u03b2\u03b3\u03b4\u03b5\u03b6\u03b7\u03b8")
+        try:
+            password = u"x\u03b1\u03b2\u03b3y\u03b6\u03b5\u03b4"
+            matches = matching.sequence_match(password)
+            msg = "matches registered sequences in both directions"
+            self.check_matches(msg, matches, "sequence", [password[1:4], password[5:8]], [[1, 3], [5, 7]], {
+                "sequence_name": ["greek", "greek"],
+                "sequence_space": [8, 8],
+                "ascending": [True, False]
+            })
+            msg = "swaps in new tables, leaving the old ones alone"
+            self.assertNotIn("greek", sequences, msg)
+            self.assertNotIn(u"\u03b1", table, msg)
+        finally:
+            matching.SEQUENCES, matching.SEQUENCE_TABLE = sequences, table
+
+        msg = "rejects sequences too short to run"
+        for sequence in ["", "a"]:
+            self.assertRaises(ValueError, matching.register_sequence, "short", sequence)
+        self.assertNotIn("short", matching.SEQUENCES, msg)
+
     def test_repeat_match(self):
 
         # Case
@@ -830,6 +1023,40 @@ class TestMatchingFunctions(unittest.TestCase):
             "base_token": ["ab"]
         })
 
+        # Case
+        matches = matching.repeat_match("ab\nabab\nab")
+        msg = "doesn't match repeats across a newline"
+        self.check_matches(msg, matches, "repeat", ["abab"], [[3, 6]], {
+            "base_token": ["ab"]
+        })
+
+        # Case
+        base_analyses = {}
+        matches = matching.repeat_match("xyzxyz1xyzxyzxyz", _base_analyses=base_analyses)
+        msg = "analyses each base token once"
+        self.check_matches(msg, matches, "repeat", ["xyzxyz", "xyzxyzxyz"], [[0, 5], [7, 15]], {
+            "base_token": ["xyz", "xyz"],
+            "repeat_count": [2, 3]
+        })
+        self.assertEqual(list(base_analyses.keys()), ["xyz"], msg)
+        self.assertEqual(matches[0]["base_guesses"], matches[1]["base_guesses"], msg)
+
+        # Case
+        for base_token, length in [["a", 1], ["ab", 2], ["aab", 3], ["abab", 2], ["abaab", 5], ["", 0]]:
+            msg = "finds the shortest period of {}".format(base_token)
+            self.assertEqual(matching.smallest_period(base_token), length, msg)
+
+        # Case
+        msg = "finds the shortest and longest square at each index, as the lazy and greedy regexes do"
+        for password in ["abcabcabcabc", "aab\naabaab", "abcacbabcbacabcacbabcbac", "xyxy" * 10 + "q" + "aa" * 20]:
+            expected = ([], [])
+            for i in range(len(password)):
+                halves = [m.end(1) - i for m in [re.compile(r"(.+?)\1").match(password, i),
+                                                 re.compile(r"(.+)\1").match(password, i)] if m]
+                expected[0].append(halves[0] if halves else 0)
+                expected[1].append(halves[-1] if halves else 0)
+            self.assertEqual(matching.square_halves(password), expected, msg)
+
     def test_regex_match(self):
 
         # Case
@@ -864,6 +1091,22 @@ class TestMatchingFunctions(unittest.TestCase):
             }
         )
 
+        # Case
+        matches = matching.regex_match("abc2015")
+        msg = "keeps the year of recent_year matches as an int"
+        self.assertEqual([[m["regex_name"], m.get("year")] for m in matches if m["token"] == "2015"],
+                         [["recent_year", 2015]], msg)
+        msg = "matches can be pickled"
+        self.assertEqual(pickle.loads(pickle.dumps([m.to_dict() for m in matches])), matches, msg)
+
+        # Case
+        regexen = dict(matching.REGEXEN, digits=re.compile(r"\d{3,}"))
+        matches = matching.regex_match("a12 345", regexen)
+        msg = "matches replaced regexen"
+        self.check_matches(msg, matches, "regex", ['a12', '345'], [[0, 2], [4, 6]], {
+            "regex_name": ['alphanumeric', 'digits']
+        })
+
     def test_date_match(self):
 
         # Case
@@ -994,11 +1237,509 @@ class TestMatchingFunctions(unittest.TestCase):
             }
         )
 
+        # Case
+        for password in ["123456\n", "1/1/91\n"]:
+            matches = matching.date_match(password)
+            msg = "doesn't take a trailing newline into a date: {!r}".format(password)
+            self.assertTrue(matches, msg)
+            self.assertTrue(all("\n" not in m["token"] for m in matches), msg)
+
+        # Case
+        password = "4111111111111111"
+        matches = matching.date_match(password)
+        msg = "drops dates inside longer ones in a run of digits"
+        self.assertTrue(all(
+            not (other["i"] <= m["i"] and other["j"] >= m["j"])
+            for m in matches for other in matches if other is not m), msg)
+
+    def test_match_types(self):
+        match = match_types.DictionaryMatch(0, 4, "R0ses", "roses", 12, "english")
+        expected = {"pattern": "dictionary", "i": 0, "j": 4, "token": "R0ses", "matched_word": "roses",
+                    "rank": 12, "dictionary_name": "english", "reversed": False}
+
+        # Case
+        msg = "reads like the match dict, with only the keys set"
+        self.assertEqual(match.to_dict(), expected, msg)
+        self.assertEqual(match, expected, msg)
+        self.assertEqual(match["pattern"], "dictionary", msg)
+        self.assertNotIn("l33t", match, msg)
+        self.assertNotIn("guesses", match, msg)
+        self.assertIsNone(match.get("sub"), msg)
+        self.assertRaises(KeyError, lambda: match["l33t"])
+
+        # Case
+        msg = "sets keys by assignment, and the guesses once estimated"
+        match["l33t"] = True
+        match["sub"] = {"0": "o"}
+        scoring.estimate_guesses(match, "R0ses")
+        self.assertTrue(match.l33t, msg)
+        self.assertEqual(match["guesses"], match.guesses, msg)
+        self.assertIn("uppercase_variations", match.to_dict(), msg)
+        self.assertNotEqual(match, expected, msg)
+
+        # Case
+        msg = "converts match dicts"
+        converted = match_types.as_match(expected)
+        self.assertIsInstance(converted, match_types.DictionaryMatch, msg)
+        self.assertEqual(converted, expected, msg)
+
+        # Case
+        msg = "keeps has_full_year of date dicts and leaves out unknown keys"
+        date = {"pattern": "date", "i": 0, "j": 7, "token": "1/1/2010", "separator": "/",
+                "year": 2010, "month": 1, "day": 1, "has_full_year": True, "note": "extra"}
+        converted = match_types.as_match(date)
+        self.assertTrue(converted["has_full_year"], msg)
+        self.assertNotIn("note", converted, msg)
+        self.assertEqual(scoring.estimate_guesses(converted, "1/1/2010"),
+                         scoring.estimate_guesses(dict(date), "1/1/2010"), msg)
+
+        # Case
+        msg = "returns plain dicts from zxcvbn"
+        for m in zxcvbn("R0ses1987qwerty")["sequence"]:
+            self.assertIs(type(m), dict, msg)
+
+
+class TestZxcvbn(unittest.TestCase):
+
+    def test_zxcvbn_many(self):
+        passwords = ["correcthorsebatterystaple", "P@ssw0rd", "rosebud1987", "qwertyuiop"]
+        user_inputs = ["rosebud", 1987]
+
+        stats = BatchStats()
+        results = zxcvbn_many(iter(passwords), user_inputs, stats=stats)
+        msg = "yields results lazily"
+        self.assertEqual(stats.count, 0, msg)
+
+        for password, result in zip(passwords, results):
+            expected = zxcvbn(password, user_inputs)
+            msg = "gives the same result as zxcvbn for {}".format(password)
+            for key in ["guesses", "score", "feedback", "crack_times_display"]:
+                self.assertEqual(result[key], expected[key], msg)
+            self.assertEqual([(m["pattern"], m["i"], m["j"]) for m in result["sequence"]],
+                             [(m["pattern"], m["i"], m["j"]) for m in expected["sequence"]], msg)
+
+        msg = "reports aggregate throughput"
+        self.assertEqual(stats.count, len(passwords), msg)
+        self.assertTrue(stats.elapsed > 0 and stats.throughput > 0, msg)
+
+    def test_concurrent_user_inputs(self):
+        # every thread scores its own secret word, which only its own user inputs contain
+        results = {}
+        errors = []
+
+        def worker(k):
+            secret = "qjx{}vzk".format("wyf" * (k % 7 + 1))
+            try:
+                for _ in range(20):
+                    result = zxcvbn(secret + "!", user_inputs=[secret, k])
+                    sequence = result["sequence"]
+                    if sequence[0].get("dictionary_name") != "user_inputs" or \
+                            sequence[0]["matched_word"] != secret:
+                        results[k] = sequence
+                        return
+                results[k] = True
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        msg = "each call matches only its own user inputs under contention"
+        self.assertEqual(results, dict((k, True) for k in range(16)), msg)
+
+    def test_max_length(self):
+        password = "correcthorse" + "x7#q" * 2000
+        result = zxcvbn(password, max_length=12)
+        prefix = zxcvbn(password[:12])
+
+        # Case
+        msg = "scores the prefix exactly and the rest as one bruteforce match"
+        self.assertEqual(result["sequence"][:-1], prefix["sequence"], msg)
+        self.assertEqual(result["sequence"][-1]["pattern"], "bruteforce", msg)
+        self.assertEqual([result["sequence"][-1]["i"], result["sequence"][-1]["j"]], [12, len(password) - 1], msg)
+        self.assertAlmostEqual(result["guesses_log10"], prefix["guesses_log10"] + 8000, msg=msg)
+        self.assertEqual(result["score"], 4, msg)
+
+        # Case
+        msg = "leaves passwords within max_length alone"
+        self.assertEqual(zxcvbn("correcthorse", max_length=12)["guesses"], prefix["guesses"], msg)
+
+        # Case
+        msg = "rejects a negative max_length"
+        self.assertRaises(ValueError, zxcvbn, password, max_length=-1)
+
+        # Case
+        msg = "keeps the matches starting earliest within the budget"
+        matches = matching.omnimatch("a" * 200)
+        budgeted = matching.omnimatch("a" * 200, _max_matches=100)
+        self.assertEqual([(m["pattern"], m["i"], m["j"], m["token"]) for m in budgeted],
+                         [(m["pattern"], m["i"], m["j"], m["token"]) for m in matches[:100]], msg)
+
+        # Case
+        from pyzxcvbn import ZxcvbnSession
+        password = "a" * 120 + "qwertyuiop"
+        user_inputs = ["a" * length for length in range(2, 30)]
+        ranked_dictionaries = matching.with_user_input_dictionary(user_inputs)
+        matches = matching.omnimatch(password, ranked_dictionaries)
+        msg = "searches every match without max_length, even past the budget"
+        self.assertTrue(len(matches) > matching.MAX_MATCHES, msg)
+        expected = scoring.most_guessable_match_sequence(password, matches)["guesses"]
+        self.assertEqual(zxcvbn(password, user_inputs)["guesses"], expected, msg)
+        self.assertEqual(ZxcvbnSession(user_inputs).update(password)["guesses"], expected, msg)
+        msg = "applies the budget along with max_length"
+        budgeted = scoring.most_guessable_match_sequence(password, matches[:matching.MAX_MATCHES])["guesses"]
+        self.assertEqual(zxcvbn(password, user_inputs, max_length=len(password))["guesses"], budgeted, msg)
+
+    def test_score_many(self):
+        passwords = ["correcthorsebatterystaple", "P@ssw0rd", "rosebud1987", "qwertyuiop", "abcd-2/14/1995",
+                     "AaBbCc", "1234567890", "zyxwvu", "2013tigger", "", "drowssap", "Tr0ub4dour&3" * 3]
+        user_inputs = ["rosebud", 1987]
+        numpy = bulk.numpy
+        try:
+            for use_numpy in [True, False]:
+                if not use_numpy:
+                    bulk.numpy = None
+                elif numpy is None:
+                    continue
+                results = list(bulk.score_many(iter(passwords), user_inputs, chunksize=5))
+                for password, result in zip(passwords, results):
+                    expected = zxcvbn(password, user_inputs)
+                    msg = "gives the guesses and score of zxcvbn for {} (numpy: {})".format(password, use_numpy)
+                    self.assertEqual([result["guesses"], result["guesses_log10"], result["score"]],
+                                     [expected["guesses"], expected["guesses_log10"], expected["score"]], msg)
+                msg = "scores every password (numpy: {})".format(use_numpy)
+                self.assertEqual(len(results), len(passwords), msg)
+
+                msg = "thresholds guesses like guesses_to_score (numpy: {})".format(use_numpy)
+                guesses = [0, 1e3 + 4, 1e3 + 5, 1e6, 1e8 + 5, 1e10 + 5, 1e20, float("inf")]
+                self.assertEqual(bulk.guesses_to_scores(guesses),
+                                 [time_estimates.guesses_to_score(g) for g in guesses], msg)
+        finally:
+            bulk.numpy = numpy
+
+    def test_zxcvbn_score(self):
+        from pyzxcvbn import zxcvbn_score
+        passwords = ["", "a", "zxcvbn", "password", "P@ssw0rd", "rosebud1987", "correcthorsebatterystaple",
+                     "dragonmonkey", "qwertyuiop", "abcd-2/14/1995", "x7#qL9!m", "Tr0ub4dour&3" * 3]
+
+        # Case
+        for password in passwords:
+            msg = "gives the score of zxcvbn for {}".format(password)
+            self.assertEqual(zxcvbn_score(password, ["rosebud"]), zxcvbn(password, ["rosebud"])["score"], msg)
+            msg = "gives the score of zxcvbn with max_length for {}".format(password)
+            self.assertEqual(zxcvbn_score(password, max_length=8), zxcvbn(password, max_length=8)["score"], msg)
+
+        # Case
+        for password in passwords:
+            for max_length in [None, 8]:
+                score = zxcvbn(password, ["rosebud"], max_length=max_length)["score"]
+                msg = "gives the score of zxcvbn from min_score - 1 up for {}, max_length={}".format(password, max_length)
+                self.assertEqual([zxcvbn_score(password, ["rosebud"], max_length, min_score) for min_score in range(6)],
+                                 [max(score, min_score - 1) for min_score in range(6)], msg)
+
+    def test_feedback(self):
+        from pyzxcvbn import feedback
+
+        # Case
+        result = zxcvbn("password")
+        msg = "gives the feedback of the longest match"
+        self.assertEqual(result["feedback"], {
+            "warning": "This is a top-10 common password",
+            "suggestions": ["Add another word or two. Uncommon words are better."]
+        }, msg)
+
+        # Case
+        msg = "leaves out the feedback when asked to"
+        self.assertNotIn("feedback", zxcvbn("password", feedback=False), msg)
+        self.assertEqual(zxcvbn("password", feedback=False)["score"], result["score"], msg)
+
+        # Case
+        messages = dict((message_id, message_id.upper()) for message_id in feedback.MESSAGES)
+        msg = "looks up the messages in the given table"
+        self.assertEqual(zxcvbn("password", feedback=messages)["feedback"], {
+            "warning": "TOP10_PASSWORD",
+            "suggestions": ["ADD_ANOTHER_WORD"]
+        }, msg)
+
+        # Case
+        msg = "only leaves out the feedback for feedback=False"
+        self.assertRaises(KeyError, zxcvbn, "password", feedback={})
+        self.assertEqual(zxcvbn("password", feedback=None)["feedback"], result["feedback"], msg)
+        self.assertRaises(TypeError, zxcvbn, "password", feedback=0)
+        self.assertRaises(TypeError, zxcvbn, "password", feedback="fr")
+        if six.PY3:
+            msg = "keeps the english messages read-only"
+            with self.assertRaises(TypeError):
+                feedback.MESSAGES["top10_password"] = "changed"
+
+        # Case
+        first = feedback.get_feedback(0, [])
+        first["suggestions"].append("changed")
+        msg = "returns a new dict each time"
+        self.assertEqual(feedback.get_feedback(0, []), feedback.default_feedback, msg)
+
+    def test_profile(self):
+        profiles = []
+        result = zxcvbn("Tr0ub4dour&3 1987", profile=profiles.append)
+        msg = "reports a profile of the call"
+        self.assertEqual(len(profiles), 1, msg)
+        profile = profiles[0]
+        self.assertEqual(list(profile.timings.keys()), [
+            "dictionary_match", "reverse_dictionary_match", "l33t_match", "spatial_match",
+            "repeat_match", "sequence_match", "regex_match", "date_match",
+            "most_guessable_match_sequence", "estimate_attack_times", "get_feedback"
+        ], msg)
+        self.assertTrue(all(t >= 0 for t in profile.timings.values()), msg)
+        self.assertEqual(profile.total, sum(profile.as_dict()["timings"].values()), msg)
+
+        msg = "counts the matches of each pattern"
+        matches = matching.omnimatch("Tr0ub4dour&3 1987")
+        for pattern in ["dictionary", "regex", "date"]:
+            self.assertEqual(profile.match_counts[pattern],
+                             len([m for m in matches if m["pattern"] == pattern]), msg)
+
+        msg = "doesn't change the result"
+        self.assertEqual(result["guesses"], zxcvbn("Tr0ub4dour&3 1987")["guesses"], msg)
+
+        profiles = []
+        list(zxcvbn_many(["abc", "def"], profile=profiles.append))
+        msg = "reports a profile per password of a batch"
+        self.assertEqual(len(profiles), 2, msg)
+
+    @unittest.skipIf(six.PY2, "asyncio is Python 3 only")
+    def test_zxcvbn_async(self):
+        import asyncio
+        from pyzxcvbn.aio import zxcvbn_async
+
+        passwords = ["", "rosebud1987", "correcthorsebatterystaple" * 4]
+        loop = asyncio.new_event_loop()
+        try:
+            for password in passwords:
+                # a zero time slice yields at every step
+                result = loop.run_until_complete(zxcvbn_async(password, ["rosebud"], time_slice=0))
+                expected = zxcvbn(password, ["rosebud"])
+                msg = "scores {} the same as zxcvbn".format(password)
+                self.assertEqual(result["guesses"], expected["guesses"], msg)
+                self.assertEqual(result["feedback"], expected["feedback"], msg)
+                self.assertEqual(len(result["sequence"]), len(expected["sequence"]), msg)
+        finally:
+            loop.close()
+
+    def test_session(self):
+        from pyzxcvbn import ZxcvbnSession
+
+        user_inputs = ["alice"]
+        session = ZxcvbnSession(user_inputs)
+        # typing, backspacing, an edit in the middle and a paste
+        passwords = ["d", "dr", "dra", "drag", "drago", "dragon", "dragon1", "dragon19", "dragon1987",
+                     "dragon19", "dragonalice19", "dragonalice1987", "qwertyalice", "", "aaaa"]
+        for password in passwords:
+            result = session.update(password)
+            expected = zxcvbn(password, user_inputs)
+            msg = "scores {} the same as zxcvbn".format(password)
+            self.assertEqual(result["guesses"], expected["guesses"], msg)
+            self.assertEqual(result["score"], expected["score"], msg)
+            self.assertEqual([[m["pattern"], m["i"], m["j"]] for m in result["sequence"]],
+                             [[m["pattern"], m["i"], m["j"]] for m in expected["sequence"]], msg)
+
+
+class TestZxcvbnPool(unittest.TestCase):
+
+    def test_preload(self):
+        graph = {"a": ["b", None], "b": [None, "a"]}
+        matching.preload(_graphs={"tiny": graph})
+        msg = "compiles the keyboard graphs before the workers are forked"
+        self.assertIs(matching._compiled_graphs[id(graph)][0], graph, msg)
+        self.assertIs(matching.compiled_graph(graph), matching._compiled_graphs[id(graph)][1], msg)
+
+    def test_map(self):
+        from pyzxcvbn import feedback
+        from pyzxcvbn.pool import ZxcvbnPool
+
+        passwords = ["correcthorsebatterystaple", "abc2015xyz", "rosebud1987", "aaaaaa", "qwertyuiop"]
+        user_inputs = ["rosebud"]
+        messages = dict((message_id, message_id.upper()) for message_id in feedback.MESSAGES)
+        with ZxcvbnPool(workers=2, chunksize=2) as pool:
+            results = pool.map(passwords, user_inputs)
+            results_without_feedback = pool.map(passwords, user_inputs, feedback=False)
+            translated = pool.map(["password"], feedback=messages)
+            truncated = pool.map(passwords, user_inputs, max_length=6)
+
+        msg = "returns one result per password, in order"
+        self.assertEqual([r["password"] for r in results], passwords, msg)
+        for password, result in zip(passwords, results):
+            expected = zxcvbn(password, user_inputs)
+            msg = "scores {} the same as zxcvbn".format(password)
+            self.assertEqual(result["guesses"], expected["guesses"], msg)
+            self.assertEqual(result["score"], expected["score"], msg)
+            self.assertEqual(result["feedback"], expected["feedback"], msg)
+
+        msg = "passes the feedback option to the workers"
+        self.assertNotIn("feedback", results_without_feedback[0], msg)
+        self.assertEqual(results_without_feedback[0]["score"], results[0]["score"], msg)
+        self.assertEqual(translated[0]["feedback"]["warning"], "TOP10_PASSWORD", msg)
+
+        msg = "passes max_length to the workers"
+        self.assertEqual([r["guesses"] for r in truncated],
+                         [zxcvbn(password, user_inputs, max_length=6)["guesses"] for password in passwords], msg)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_zxcvbn(self):
+        from pyzxcvbn.cache import ResultCache
+
+        cache = ResultCache(maxsize=2)
+        first = cache.zxcvbn("Tr0ub4dour&3", ["troubadour"])
+        first["sequence"].pop()
+        second = cache.zxcvbn("Tr0ub4dour&3", ["troubadour"])
+        expected = zxcvbn("Tr0ub4dour&3", ["troubadour"])
+        msg = "returns a copy of the cached result"
+        self.assertEqual(len(second["sequence"]), len(expected["sequence"]), msg)
+        self.assertEqual(second["guesses"], expected["guesses"], msg)
+        self.assertEqual((cache.hits, cache.misses), (1, 1), msg)
+
+        msg = "keys on the user inputs too"
+        self.assertNotEqual(cache.key("Tr0ub4dour&3", ["troubadour"]), cache.key("Tr0ub4dour&3"), msg)
+        self.assertNotEqual(cache.key("ab", ["c"]), cache.key("a", ["bc"]), msg)
+        self.assertNotIn("Tr0ub4dour", cache.key("Tr0ub4dour&3"), msg)
+
+        msg = "evicts the least recently used entry"
+        cache.zxcvbn("password1")
+        cache.zxcvbn("Tr0ub4dour&3", ["troubadour"])
+        cache.zxcvbn("password2")
+        self.assertEqual(cache.evictions, 1, msg)
+        cache.zxcvbn("Tr0ub4dour&3", ["troubadour"])
+        self.assertEqual((cache.hits, cache.misses), (3, 3), msg)
+
+        msg = "keys on max_length too"
+        self.assertNotEqual(cache.key("Tr0ub4dour&3", max_length=4), cache.key("Tr0ub4dour&3"), msg)
+        self.assertNotEqual(cache.key("Tr0ub4dour&3", max_length=4), cache.key("Tr0ub4dour&3", max_length=5), msg)
+        msg = "scores with max_length"
+        for _ in range(2):
+            self.assertEqual(cache.zxcvbn("Tr0ub4dour&3", max_length=4)["guesses"],
+                             zxcvbn("Tr0ub4dour&3", max_length=4)["guesses"], msg)
+        self.assertEqual((cache.hits, cache.misses), (4, 4), msg)
+
+    def test_ttl(self):
+        from pyzxcvbn.cache import MemoryStore
+
+        now = [0.0]
+        store = MemoryStore(ttl=10, _timer=lambda: now[0])
+        store.set("key", {"guesses": 1})
+        now[0] = 9.0
+        msg = "keeps entries for ttl seconds"
+        self.assertEqual(store.get("key"), {"guesses": 1}, msg)
+        now[0] = 10.0
+        self.assertIsNone(store.get("key"), msg)
+        self.assertEqual(store.evictions, 1, msg)
+
+    def test_store_interface(self):
+        from pyzxcvbn.cache import CacheStore
+
+        class GetOnlyStore(CacheStore):
+            def get(self, key):
+                return None
+
+        msg = "refuses to create a store missing a method"
+        self.assertRaises(TypeError, GetOnlyStore)
+
+
+class TestFrequencyData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        lists = {
+            "d1": ["mother", "board", u"caf\xe9"],
+            "d2": [],
+            "d3": ["z"]
+        }
+        path = os.path.join(self.tmp_dir, "lists.bin")
+        frequency_data.write_frequency_data(path, lists, ["d3", "d1", "d2"])
+        data = frequency_data.FrequencyData(path)
+
+        msg = "keeps the order of the written lists"
+        self.assertEqual(data.names, ["d3", "d1", "d2"], msg)
+
+        for name, words in lists.items():
+            msg = "reads back '{}' in rank order".format(name)
+            self.assertEqual(list(data[name]), words, msg)
+            self.assertEqual(data[name].words(), words, msg)
+            msg = "builds the same ranked dict as build_ranked_dict for '{}'".format(name)
+            self.assertEqual(data[name].ranked_dict(), matching.build_ranked_dict(words), msg)
+
+        msg = "gives random access to a word by rank"
+        self.assertEqual(data["d1"][2], u"caf\xe9", msg)
+        self.assertEqual(data["d1"][-3], "mother", msg)
+
+        msg = "keeps the words of all lists sorted"
+        self.assertEqual(data.sorted_words.words(), ["board", u"caf\xe9", "mother", "z"], msg)
+        self.assertEqual([data.sorted_words.find(word) for word in ["a", "c", "mother", "zz"]],
+                         [(0, "board"), (1, u"caf\xe9"), (2, "mother"), (4, None)], msg)
+        self.assertIs(data["d1"].ranked_dict().frequency_data, data, msg)
+
+    def test_bundled_data(self):
+        from pyzxcvbn.frequency_lists import frequency_lists
+
+        data = frequency_data.default_frequency_data()
+        msg = "bundled frequency_lists.bin is built"
+        self.assertIsNotNone(data, msg)
+        for name in matching.FREQUENCY_LIST_NAMES:
+            msg = "frequency_lists.bin is up to date with frequency_lists.py for '{}'".format(name)
+            self.assertEqual(data[name].words(), frequency_lists[name], msg)
+
+    def test_lazy_ranked_dictionaries(self):
+        calls = []
+
+        def loader(name):
+            def load():
+                calls.append(name)
+                return {name: 1}
+            return load
+
+        ranked = frequency_data.LazyRankedDictionaries([("b", loader("b")), ("a", loader("a"))])
+        self.assertEqual(calls, [], "doesn't build dictionaries before use")
+        self.assertEqual(ranked["a"], {"a": 1})
+        self.assertEqual(ranked["a"], {"a": 1})
+        self.assertEqual(calls, ["a"], "builds a dictionary once, on first access")
+        ranked["c"] = {"c": 1}
+        self.assertEqual(list(ranked), ["b", "a", "c"], "iterates in source order")
+
+        # Case
+        ranked.select(["a"])
+        self.assertEqual(list(ranked), ["a"], "keeps only the selected dictionaries")
+        self.assertNotIn("b", ranked, "drops the others")
+        self.assertEqual(ranked.memory_usage(), {"a": frequency_data.ranked_dict_size({"a": 1})},
+                         "reports the size of the built dictionaries")
+        ranked.select(["b", "a"])
+        self.assertEqual(ranked["b"], {"b": 1}, "builds a reselected dictionary")
+        self.assertEqual(calls, ["a", "b"], "doesn't build dropped dictionaries")
+        self.assertNotIn("c", ranked.sources(), "deletes dropped dictionaries that have no source")
+        self.assertRaises(KeyError, ranked.select, ["d"])
+
+        # Case
+        ranked.add_source("d", loader("d"))
+        self.assertEqual(list(ranked), ["b", "a", "d"], "selects added sources")
+        self.assertFalse(ranked.is_loaded("d"), "builds added sources on first access")
+
 
 def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTests(unittest.makeSuite(TestMatchingFunctions))
     test_suite.addTests(unittest.makeSuite(TestScoringFunctions))
+    test_suite.addTests(unittest.makeSuite(TestFrequencyData))
+    test_suite.addTests(unittest.makeSuite(TestZxcvbn))
+    test_suite.addTests(unittest.makeSuite(TestZxcvbnPool))
+    test_suite.addTests(unittest.makeSuite(TestResultCache))
     return test_suite
 
 if __name__ == "__main__":